@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import unbabel_cli as mv_avg_script
+from generate_events import write_events
+
+# The stages of the main workflow of unbabel_cli.py, each receiving the results of the previous ones. The moving
+# average with percentiles is measured next to the one with the average only, to compare their costs.
+STAGES = (
+    "pars_translation_files",
+    "create_list_of_minutes",
+    "calc_moving_average",
+    "calc_moving_average_percentiles",
+    "save_output_file",
+)
+
+def run_stage(stage: str, context: dict):
+    """
+    Runs one stage of the main workflow with the inputs stored in <context>.
+
+    Parameters:
+        stage (str): name of the stage, from STAGES.
+        context (dict): the input file, the window size, the output file and the results of the previous stages.
+
+    Returns:
+        the result of the stage.
+    """
+    if stage == "pars_translation_files":
+        return mv_avg_script.pars_translation_files(context["input_path"])
+    if stage == "create_list_of_minutes":
+        return mv_avg_script.create_list_of_minutes(context["pars_translation_files"])
+    if stage == "calc_moving_average":
+        return mv_avg_script.calc_moving_average(
+            context["create_list_of_minutes"], context["pars_translation_files"], context["window_size"]
+        )
+    if stage == "calc_moving_average_percentiles":
+        return mv_avg_script.calc_moving_average(
+            context["create_list_of_minutes"], context["pars_translation_files"], context["window_size"], [50, 95, 99]
+        )
+    return mv_avg_script.save_output_file(context["calc_moving_average"], context["output_path"])
+
+def measure_stage(stage: str, context: dict, repeat: int) -> dict:
+    """
+    Measures the best wall time of <repeat> runs of a stage, and its peak memory in a separate run, since tracing the
+    memory allocations slows the stage down.
+
+    Parameters:
+        stage (str): name of the stage, from STAGES.
+        context (dict): the inputs of the stage, where its result is stored.
+        repeat (int): the number of timed runs.
+
+    Returns:
+        dict: the best time in seconds and the peak memory in bytes of the stage.
+    """
+    best_time = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        context[stage] = run_stage(stage, context)
+        best_time = min(best_time, time.perf_counter() - start)
+
+    tracemalloc.start()
+    run_stage(stage, context)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": best_time, "peak_memory": peak_memory}
+
+def run_benchmark(sizes: list[int], window_sizes: list[int], repeat: int = 3, seed: int = 0) -> dict:
+    """
+    Generates an input file for each size and measures each stage of the main workflow for each window size. The
+    parsing and the list of minutes do not depend on the window size, so they are only measured once per input size.
+
+    Parameters:
+        sizes (list[int]): the numbers of events of the input files.
+        window_sizes (list[int]): the window sizes.
+        repeat (int): the number of timed runs of each stage.
+        seed (int): seed of the event generator.
+
+    Returns:
+        dict: the measures of each case, identified by "<stage>/<size>" or "<stage>/<size>/<window size>", with the
+            time, the peak memory and the number of events processed per second.
+    """
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            context = {
+                "input_path": os.path.join(directory, f"events_{size}.json"),
+                "output_path": os.path.join(directory, "output_file.json"),
+            }
+            write_events(context["input_path"], size, seed=seed)
+
+            for window_size in window_sizes:
+                context["window_size"] = window_size
+                for stage in STAGES:
+                    depends_on_window = STAGES.index(stage) >= STAGES.index("calc_moving_average")
+                    if not depends_on_window and window_size != window_sizes[0]:
+                        continue
+
+                    case = f"{stage}/{size}/{window_size}" if depends_on_window else f"{stage}/{size}"
+                    measure = measure_stage(stage, context, repeat)
+                    measure["events_per_second"] = size / measure["seconds"] if measure["seconds"] else None
+                    results[case] = measure
+
+    return results
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float, min_seconds: float = 0.01) -> list[str]:
+    """
+    Compares the times of the benchmark with the ones of a previous run.
+
+    Parameters:
+        results (dict): the measures, as returned by run_benchmark.
+        baseline (dict): the measures of the previous run.
+        tolerance (float): the relative slowdown allowed, e.g. 0.2 for 20%.
+        min_seconds (float): cases faster than this are too noisy to be compared.
+
+    Returns:
+        list[str]: a message for each case slower than the baseline plus the tolerance.
+    """
+    regressions = []
+
+    for case, measure in results.items():
+        if case not in baseline:
+            continue
+        baseline_seconds = baseline[case]["seconds"]
+        if measure["seconds"] > max(baseline_seconds * (1 + tolerance), min_seconds):
+            regressions.append(
+                f"{case}: {measure['seconds']:.4f}s, baseline {baseline_seconds:.4f}s (+{measure['seconds'] / baseline_seconds - 1:.0%})"
+            )
+
+    return regressions
+
+def main():
+    """
+    Define main script
+    """
+    parser = argparse.ArgumentParser(description="Benchmark each stage of unbabel_cli.py with synthetic input files")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=[10_000, 100_000], help="Comma separated numbers of events")
+    parser.add_argument("--windows", type=lambda value: [int(size) for size in value.split(",")], default=[1, 10, 60], help="Comma separated window sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs of each stage")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the event generator")
+    parser.add_argument("--baseline", type=str, default="benchmark_baseline.json", help="Path to the baseline results")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the new baseline instead of comparing them")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative slowdown allowed before reporting a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.01, help="Cases faster than this are not compared, since they are too noisy")
+
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.windows, args.repeat, args.seed)
+
+    for case, measure in results.items():
+        print(f"{case:<45} {measure['seconds']:>9.4f}s {measure['events_per_second'] or 0:>14,.0f} events/s {measure['peak_memory'] / 2**20:>9.1f} MiB")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f"Baseline saved to {args.baseline}.")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline found in {args.baseline}, run with --save-baseline to create it.")
+        return
+
+    with open(args.baseline) as baseline_file:
+        regressions = compare_with_baseline(results, json.load(baseline_file), args.tolerance, args.min_seconds)
+
+    if regressions:
+        print("Performance regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No performance regressions.")
+
+if __name__ == "__main__":
+    main()
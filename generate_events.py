@@ -0,0 +1,127 @@
+import argparse
+import random
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from unbabel_cli import open_output_file
+
+LANGUAGES = ("en", "fr", "pt", "es", "de", "it", "nl", "ja", "zh", "ru")
+
+def iter_events(
+    nr_lines: int,
+    seed: int = 0,
+    start: datetime = datetime(2018, 12, 26, 18, 0),
+    events_per_minute: float = 60.0,
+    burstiness: float = 0.5,
+    gap_rate: float = 0.0001,
+    gap_minutes: int = 240,
+    duplicate_rate: float = 0.01,
+    nr_clients: int = 100,
+) -> Iterator[str]:
+    """
+    Generates realistic translation delivered events, in the format of the input files and ordered by timestamp. The
+    same arguments always generate the same events.
+
+    Parameters:
+        nr_lines (int): the number of events.
+        seed (int): seed of the random generator.
+        start (datetime): timestamp where the events start.
+        events_per_minute (float): average number of events per minute, outside the gaps.
+        burstiness (float): variability of the rate of events, which changes every minute. With 0 the events arrive
+            at a constant rate, and higher values produce bursts and quiet minutes.
+        gap_rate (float): probability of a gap without events after each event.
+        gap_minutes (int): maximum duration of a gap, in minutes.
+        duplicate_rate (float): probability of an event repeating the translation id of a recent one.
+        nr_clients (int): number of different clients.
+
+    Returns:
+        Iterator[str]: a json line for each event, ending with a new line.
+    """
+    rng = random.Random(seed)
+    clients = [f"client-{index}" for index in range(nr_clients)]
+    recent_translation_ids = deque(maxlen=1000)
+
+    timestamp = start
+    rate_minute = None
+    rate = events_per_minute
+
+    for _ in range(nr_lines):
+        # The rate of events changes every minute
+        if timestamp.replace(second=0, microsecond=0) != rate_minute:
+            rate_minute = timestamp.replace(second=0, microsecond=0)
+            rate = events_per_minute * rng.lognormvariate(-burstiness ** 2 / 2, burstiness)
+        timestamp += timedelta(microseconds=int(rng.expovariate(rate) * 60_000_000))
+        if rng.random() < gap_rate:
+            timestamp += timedelta(minutes=rng.uniform(1, gap_minutes))
+
+        if recent_translation_ids and rng.random() < duplicate_rate:
+            translation_id = rng.choice(recent_translation_ids)
+        else:
+            translation_id = f"{rng.getrandbits(80):020x}"
+            recent_translation_ids.append(translation_id)
+
+        source_language, target_language = rng.sample(LANGUAGES, 2)
+        nr_words = int(rng.lognormvariate(4, 1)) + 1
+        duration = int(rng.lognormvariate(3, 0.7)) + nr_words // 20
+
+        yield (
+            f'{{"timestamp": "{timestamp:%Y-%m-%d %H:%M:%S.%f}","translation_id": "{translation_id}",'
+            f'"source_language": "{source_language}","target_language": "{target_language}",'
+            f'"client_name": "{rng.choice(clients)}","event_name": "translation_delivered",'
+            f'"nr_words": {nr_words}, "duration": {duration}}}\n'
+        )
+
+def write_events(output_path: str, nr_lines: int, batch_size: int = 4096, **kwargs) -> None:
+    """
+    Writes the events generated by iter_events to a file.
+
+    Parameters:
+        output_path (str): Path to the output file, compressed when it ends with .gz or .zst, or "-" for the standard
+            output.
+        nr_lines (int): the number of events.
+        batch_size (int): number of lines joined into a single write.
+        **kwargs: the other arguments of iter_events.
+    """
+    with open_output_file(output_path) as output_file:
+        lines = []
+        for line in iter_events(nr_lines, **kwargs):
+            lines.append(line)
+            if len(lines) == batch_size:
+                output_file.write("".join(lines))
+                lines.clear()
+        output_file.write("".join(lines))
+
+def main():
+    """
+    Define main script
+    """
+    parser = argparse.ArgumentParser(description="Generate a synthetic input file with translation delivered events")
+    parser.add_argument("output_path", type=str, help="Path to the generated file (.gz and .zst are compressed), or - for stdout")
+    parser.add_argument("nr_lines", type=int, help="Number of events to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=datetime(2018, 12, 26, 18, 0), help="Timestamp of the start")
+    parser.add_argument("--events-per-minute", type=float, default=60.0, help="Average number of events per minute")
+    parser.add_argument("--burstiness", type=float, default=0.5, help="Variability of the rate of events (0 for a constant rate)")
+    parser.add_argument("--gap-rate", type=float, default=0.0001, help="Probability of a gap without events after each event")
+    parser.add_argument("--gap-minutes", type=int, default=240, help="Maximum duration of a gap, in minutes")
+    parser.add_argument("--duplicate-rate", type=float, default=0.01, help="Probability of repeating a recent translation id")
+    parser.add_argument("--clients", type=int, default=100, help="Number of different clients")
+
+    args = parser.parse_args()
+
+    write_events(
+        args.output_path,
+        args.nr_lines,
+        seed=args.seed,
+        start=args.start,
+        events_per_minute=args.events_per_minute,
+        burstiness=args.burstiness,
+        gap_rate=args.gap_rate,
+        gap_minutes=args.gap_minutes,
+        duplicate_rate=args.duplicate_rate,
+        nr_clients=args.clients,
+    )
+
+if __name__ == "__main__":
+    main()
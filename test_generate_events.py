@@ -0,0 +1,29 @@
+import generate_events
+import unbabel_cli as mv_avg_script
+
+# This script confirms that the synthetic input files used by the benchmarks are deterministic and have the expected format.
+
+def test_iter_events_deterministic():
+    """
+    Test if iter_events function generates the same events for the same seed and different ones for another seed.
+    """
+    first_events = list(generate_events.iter_events(500, seed=1))
+
+    assert first_events == list(generate_events.iter_events(500, seed=1))
+    assert first_events != list(generate_events.iter_events(500, seed=2))
+
+def test_write_events(tmp_path):
+    """
+    Test if write_events function writes a valid input file, ordered by timestamp, with the requested duplicates and clients.
+    """
+    input_file = tmp_path / "events.json"
+    generate_events.write_events(str(input_file), 2000, seed=3, duplicate_rate=0.1, nr_clients=5)
+
+    deduplicator = mv_avg_script.create_deduplicator()
+    translations = mv_avg_script.pars_translation_files(str(input_file), deduplicator)
+    timestamps = [translation["timestamp"] for translation in translations]
+
+    assert len(translations) + deduplicator.duplicates == 2000
+    assert 100 < deduplicator.duplicates < 300
+    assert timestamps == sorted(timestamps)
+    assert {translation["client_name"] for translation in translations} <= {f"client-{index}" for index in range(5)}
@@ -1,5 +1,8 @@
 import pytest
+import asyncio
+import gzip
 import json
+import math
 from datetime import datetime, timedelta
 
 import unbabel_cli as mv_avg_script
@@ -154,6 +157,22 @@ def test_pars_translation_files_incorrect_timestamp():
     )
 
 
+@pytest.mark.parametrize("timestamp", ["2018-12-26 18:11:08.509654", "2018-12-26 18:11:08.5", "2018-1-26 18:11:08.509654"])
+def test_parse_timestamp(timestamp):
+    """
+    Test if parse_timestamp function parses the timestamps like datetime.strptime, with and without the usual fixed width.
+    """
+    assert mv_avg_script.parse_timestamp(timestamp) == datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S.%f")
+
+@pytest.mark.parametrize("timestamp", ["2018-12-26 18:11:60.509654", "2018-12-26 18:11:+8.509654", "dnd3y y24"])
+def test_parse_timestamp_incorrect(timestamp):
+    """
+    Test if parse_timestamp function rejects the same timestamps as datetime.strptime.
+    """
+    with pytest.raises(ValueError):
+        mv_avg_script.parse_timestamp(timestamp)
+
+
 # Here start the tests for the function create_list_of_minutes
     
 def test_create_list_of_minutes(dummy_correct_translation, dummy_list_of_minutes):
@@ -236,3 +255,677 @@ def test_calc_moving_average_different_day():
     moving_avg = mv_avg_script.calc_moving_average(list_of_minutes, translations, 10)
 
     assert moving_avg == expected_output
+
+def test_calc_moving_average_on_the_minute():
+    """
+    Test if calc_moving_average function counts a translation delivered exactly on the minute in both limits of the window.
+    """
+    translations = [
+        {"timestamp": datetime(2018, 12, 26, 18, 11), "duration": 20},
+        {"timestamp": datetime(2018, 12, 26, 18, 12, 30), "duration": 40},
+    ]
+    expected_output = [
+        {"date": "2018-12-26 18:11:00", "average_delivery_time": 20.0},
+        {"date": "2018-12-26 18:12:00", "average_delivery_time": 20.0},
+        {"date": "2018-12-26 18:13:00", "average_delivery_time": 40.0},
+    ]
+
+    list_of_minutes = mv_avg_script.create_list_of_minutes(translations)
+    moving_avg = mv_avg_script.calc_moving_average(list_of_minutes, translations, 1)
+
+    assert moving_avg == expected_output
+
+
+def test_calc_moving_average_multiple_windows(dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if calc_moving_average function computes the moving average of each window size when a list of them is given.
+    """
+    moving_avg = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, [10, 1])
+
+    for window_size in [10, 1]:
+        single_moving_avg = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, window_size)
+        assert [
+            {"date": mv_avg["date"], "average_delivery_time": mv_avg[f"average_delivery_time_{window_size}"]} for mv_avg in moving_avg
+        ] == single_moving_avg
+
+def test_calc_moving_average_multiple_windows_wrong_size(dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if calc_moving_average function handles a list of window sizes with a size of 0 or less.
+    """
+    with pytest.raises(Exception) as wrong_size:
+        mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, [5, 0])
+
+    assert(
+        str(wrong_size.value) == "Window size value must be greater than 0."
+    )
+
+# Here start the tests to the streaming functions
+
+def test_iter_moving_average(dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if iter_moving_average function yields the same moving averages as create_list_of_minutes and calc_moving_average.
+    """
+    expected_output = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, 10)
+
+    moving_avg = mv_avg_script.iter_moving_average(mv_avg_script.iter_translations("tests_input_files/test_file.json"), 10)
+
+    assert list(moving_avg) == expected_output
+
+def test_iter_moving_average_wrong_order(dummy_correct_translation):
+    """
+    Test if iter_moving_average function handles a situation when the input is not ordered from the latest
+    to the most recent timestamp.
+    """
+    with pytest.raises(Exception) as wrong_order:
+        list(mv_avg_script.iter_moving_average(iter(dummy_correct_translation[::-1]), 10))
+
+    assert(
+        str(wrong_order.value) == "File must be ordered from the latest translation to the most recent, please correct the input file."
+    )
+
+
+# Here start the tests to the deduplication strategies
+
+@pytest.mark.parametrize("strategy", mv_avg_script.DEDUPLICATION_STRATEGIES)
+def test_deduplicator_drops_duplicates(strategy):
+    """
+    Test if every deduplication strategy drops the duplicated translations and counts them.
+    """
+    timestamp = datetime(2018, 12, 26, 18, 11)
+    deduplicator = mv_avg_script.create_deduplicator(strategy, horizon=10, capacity=100)
+
+    duplicated = [deduplicator.is_duplicate(translation_id, timestamp) for translation_id in ["a", "b", "a", "c", "b"]]
+
+    assert duplicated == [False, False, True, False, True]
+    assert deduplicator.duplicates == 2
+
+def test_time_scoped_deduplicator_forgets_old_translations():
+    """
+    Test if the window deduplication strategy only drops translations repeated inside the horizon.
+    """
+    deduplicator = mv_avg_script.create_deduplicator("window", horizon=10)
+
+    assert not deduplicator.is_duplicate("a", datetime(2018, 12, 26, 18, 11))
+    assert deduplicator.is_duplicate("a", datetime(2018, 12, 26, 18, 21))
+    assert not deduplicator.is_duplicate("a", datetime(2018, 12, 26, 18, 22))
+    assert len(deduplicator.processed_translations) == 1
+
+def test_create_deduplicator_wrong_strategy():
+    """
+    Test if create_deduplicator function handles an unknown strategy.
+    """
+    with pytest.raises(Exception) as wrong_strategy:
+        mv_avg_script.create_deduplicator("sorted")
+
+    assert(
+        str(wrong_strategy.value) == """Deduplication strategy "sorted" is not valid. Choose one of: exact, window, bloom."""
+    )
+
+
+# Here start the tests to the numpy engine
+
+def test_calc_moving_average_numpy(dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if the numpy engine computes the same list of minutes and moving averages as the python one.
+    """
+    pytest.importorskip("numpy")
+
+    expected_output = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, 10)
+
+    timestamps, durations = mv_avg_script.load_translation_arrays(dummy_correct_translation)
+    list_of_minutes = mv_avg_script.create_list_of_minutes_numpy(timestamps)
+    moving_avg = mv_avg_script.calc_moving_average_numpy(list_of_minutes, timestamps, durations, 10)
+
+    assert list_of_minutes.tolist() == dummy_list_of_minutes
+    assert moving_avg == expected_output
+
+def test_calc_moving_average_numpy_different_day():
+    """
+    Test if the numpy engine works as expected when considering calculations between different days.
+    """
+    pytest.importorskip("numpy")
+
+    translations = mv_avg_script.pars_translation_files("tests_input_files/test_file_dif_day.json")
+    expected_output = mv_avg_script.calc_moving_average(mv_avg_script.create_list_of_minutes(translations), translations, 10)
+
+    timestamps, durations = mv_avg_script.load_translation_arrays(translations)
+    list_of_minutes = mv_avg_script.create_list_of_minutes_numpy(timestamps)
+    moving_avg = mv_avg_script.calc_moving_average_numpy(list_of_minutes, timestamps, durations, 10)
+
+    assert moving_avg == expected_output
+
+def test_calc_moving_average_numpy_wrong_order(dummy_correct_translation):
+    """
+    Test if the numpy engine raises the same Exception as the python one when the first translations are swapped, instead
+    of sorting them.
+    """
+    pytest.importorskip("numpy")
+
+    translations = dummy_correct_translation[1::-1] + dummy_correct_translation[2:]
+    timestamps, durations = mv_avg_script.load_translation_arrays(translations)
+    list_of_minutes = mv_avg_script.create_list_of_minutes_numpy(timestamps)
+
+    with pytest.raises(Exception) as wrong_order:
+        mv_avg_script.calc_moving_average_numpy(list_of_minutes, timestamps, durations, 10)
+
+    assert(
+        str(wrong_order.value) == "File must be ordered from the latest translation to the most recent, please correct the input file."
+    )
+
+
+# Here start the tests to the grouped moving averages
+
+def test_iter_grouped_moving_average(dummy_correct_translation):
+    """
+    Test if iter_grouped_moving_average function computes independent moving averages for each group, only for the minutes
+    in which the group has translations inside the window.
+    """
+    expected_output = [
+        {"date": "2018-12-26 18:12:00", "client_name": "airliberty", "average_delivery_time": 20.0},
+        {"date": "2018-12-26 18:13:00", "client_name": "airliberty", "average_delivery_time": 20.0},
+        {"date": "2018-12-26 18:14:00", "client_name": "airliberty", "average_delivery_time": 20.0},
+        {"date": "2018-12-26 18:16:00", "client_name": "airliberty", "average_delivery_time": 31.0},
+        {"date": "2018-12-26 18:17:00", "client_name": "airliberty", "average_delivery_time": 31.0},
+        {"date": "2018-12-26 18:18:00", "client_name": "airliberty", "average_delivery_time": 31.0},
+        {"date": "2018-12-26 18:24:00", "client_name": "taxi-eats", "average_delivery_time": 54.0},
+    ]
+
+    moving_avg = mv_avg_script.iter_grouped_moving_average(iter(dummy_correct_translation), 3, ["client_name"])
+
+    assert list(moving_avg) == expected_output
+
+def test_iter_grouped_moving_average_wrong_field(dummy_correct_translation):
+    """
+    Test if iter_grouped_moving_average function handles a field that cannot be used to group the translations.
+    """
+    with pytest.raises(Exception) as wrong_field:
+        mv_avg_script.iter_grouped_moving_average(iter(dummy_correct_translation), 3, ["duration"])
+
+    assert(
+        str(wrong_field.value) == """Field "duration" cannot be used to group the translations. Choose from: client_name, source_language, target_language, event_name."""
+    )
+
+
+# Here start the tests to the parallel processing
+
+def test_find_chunk_boundaries():
+    """
+    Test if find_chunk_boundaries function splits the file into ranges that start at the beginning of a line and cover
+    the whole file.
+    """
+    with open("tests_input_files/test_file.json", "rb") as file:
+        content = file.read()
+
+    chunks = mv_avg_script.find_chunk_boundaries("tests_input_files/test_file.json", 5)
+
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(content)
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start and content[start - 1:start] == b"\n"
+
+def test_pars_translation_chunks(tmp_path):
+    """
+    Test if pars_translation_chunks function removes the duplicated translations across chunks and produces the same
+    moving averages as the single process workflow.
+    """
+    with open("tests_input_files/test_file.json") as file:
+        lines = file.read().splitlines()
+    input_file = tmp_path / "input.json"
+    input_file.write_text("\n".join(lines[:2] + lines[1:2] + lines[2:]) + "\n")
+
+    translations = mv_avg_script.pars_translation_files(str(input_file))
+    expected_output = mv_avg_script.calc_moving_average(mv_avg_script.create_list_of_minutes(translations), translations, 10)
+
+    deduplicator = mv_avg_script.create_deduplicator()
+    buckets = mv_avg_script.pars_translation_chunks(str(input_file), 2, deduplicator)
+
+    assert list(mv_avg_script.iter_bucket_moving_average(buckets, 10)) == expected_output
+    assert deduplicator.duplicates == 1
+
+    # A duplicate older than the previous translation is removed before the order is checked, inside a chunk too
+    input_file.write_text("\n".join(lines[:3] + lines[:1] + lines[3:]) + "\n")
+    chunk_deduplicator = mv_avg_script.create_chunk_deduplicator(mv_avg_script.create_deduplicator())
+    nr_lines, chunk_buckets, _, translation_ids, _, _, _ = mv_avg_script.parse_translation_chunk(
+        str(input_file), 0, input_file.stat().st_size, chunk_deduplicator
+    )
+    assert (nr_lines, len(translation_ids)) == (len(lines) + 1, len(lines))
+    assert list(mv_avg_script.iter_bucket_moving_average(chunk_buckets, 10)) == expected_output
+
+
+def test_pars_translation_chunks_same_as_single_process(tmp_path, monkeypatch):
+    """
+    Test if pars_translation_chunks function removes the same duplicates as the single process workflow, wherever the
+    chunks start, with the window strategy, which only remembers the translations it keeps, and with a duplicate older
+    than the translation before it.
+    """
+    line = '{"timestamp": "%s","translation_id": "%s","source_language": "en","target_language": "fr","client_name": "airliberty","event_name": "translation_delivered","nr_words": 30, "duration": %d}'
+    cases = [
+        ("window", [("2018-12-26 18:00:30.000000", "XX", 10), ("2018-12-26 18:50:30.000000", "XX", 100), ("2018-12-26 19:40:30.000000", "XX", 1000)]),
+        ("exact", [("2018-12-26 18:00:30.000000", "AA", 10), ("2018-12-26 18:05:30.000000", "BB", 100), ("2018-12-26 18:00:30.000000", "AA", 10), ("2018-12-26 18:10:30.000000", "CC", 1000)]),
+    ]
+
+    for strategy, translations in cases:
+        lines = [line % translation + "\n" for translation in translations]
+        input_file = tmp_path / "input.json"
+        input_file.write_text("".join(lines))
+        offsets = [len("".join(lines[:index])) for index in range(len(lines) + 1)]
+
+        deduplicator = mv_avg_script.create_deduplicator(strategy, 60)
+        expected_buckets = list(mv_avg_script.iter_minute_buckets(mv_avg_script.pars_translation_files(str(input_file), deduplicator)))
+        expected_output = list(mv_avg_script.iter_bucket_moving_average(expected_buckets, 60))
+
+        # Every way of splitting the lines into two chunks
+        for split in range(1, len(lines)):
+            chunks = [(offsets[0], offsets[split]), (offsets[split], offsets[-1])]
+            monkeypatch.setattr(mv_avg_script, "find_chunk_boundaries", lambda file_path, nr_chunks: chunks)
+            chunk_deduplicator = mv_avg_script.create_deduplicator(strategy, 60)
+            buckets = mv_avg_script.pars_translation_chunks(str(input_file), 2, chunk_deduplicator)
+
+            assert list(mv_avg_script.iter_bucket_moving_average(buckets, 60)) == expected_output
+            assert chunk_deduplicator.duplicates == deduplicator.duplicates == 1
+
+# Here start the tests to the follow mode
+
+def test_follow_moving_average_resumes_from_checkpoint(tmp_path, dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if follow_moving_average function writes the final minutes, and resumes from the checkpoint when new translations
+    are appended to the input file.
+    """
+    with open("tests_input_files/test_file.json") as file:
+        lines = [line + "\n" for line in file.read().splitlines()]
+    input_file = tmp_path / "input.json"
+    output_file = tmp_path / "output.json"
+    checkpoint_file = tmp_path / "input.checkpoint"
+    expected_output = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, 10)
+
+    def follow():
+        mv_avg_script.follow_moving_average(
+            str(input_file), 10, str(output_file), str(checkpoint_file), poll_interval=0, idle_timeout=0
+        )
+        return [json.loads(line) for line in output_file.read_text().splitlines()]
+
+    # The minutes before the bucket of the second translation are final
+    input_file.write_text("".join(lines[:2]))
+    assert follow() == expected_output[:5]
+
+    # Only the appended translation is read after the restart
+    input_file.write_text("".join(lines))
+    assert mv_avg_script.load_checkpoint(str(checkpoint_file)).input_offset == len("".join(lines[:2]))
+    assert follow() == expected_output[:13]
+
+
+# Here start the tests to the binary cache
+
+def test_pars_translation_files_cached(tmp_path, monkeypatch, dummy_correct_translation):
+    """
+    Test if pars_translation_files_cached function writes the cache on the first call and reads it, without parsing the
+    input file, on the following ones.
+    """
+    input_file = tmp_path / "input.json"
+    input_file.write_bytes(open("tests_input_files/test_file.json", "rb").read())
+    expected_translations = [
+        {key: value for key, value in translation.items() if key != "translation_id"} for translation in dummy_correct_translation
+    ]
+
+    first_translations = mv_avg_script.pars_translation_files_cached(str(input_file))
+    assert (tmp_path / "input.json.cache").exists()
+
+    def fail_parsing(*args):
+        raise AssertionError("The input file should not be parsed")
+    monkeypatch.setattr(mv_avg_script, "pars_translation_files", fail_parsing)
+    second_translations = mv_avg_script.pars_translation_files_cached(str(input_file))
+
+    assert list(first_translations.iter_translations()) == expected_translations
+    assert list(second_translations.iter_translations()) == expected_translations
+
+def test_pars_translation_files_cached_invalidation(tmp_path):
+    """
+    Test if pars_translation_files_cached function parses the input file again when it changes or when a different
+    deduplication strategy is used.
+    """
+    with open("tests_input_files/test_file.json") as file:
+        lines = file.read().splitlines()
+    input_file = tmp_path / "input.json"
+    input_file.write_text("\n".join(lines[:2]))
+    mv_avg_script.pars_translation_files_cached(str(input_file))
+
+    input_file.write_text("\n".join(lines))
+    assert len(mv_avg_script.pars_translation_files_cached(str(input_file))) == 3
+
+    deduplicator = mv_avg_script.create_deduplicator("window", horizon=1)
+    assert len(mv_avg_script.pars_translation_files_cached(str(input_file), deduplicator)) == 3
+    assert mv_avg_script.read_translation_cache(
+        str(tmp_path / "input.json.cache"), mv_avg_script.get_file_signature(str(input_file)), "window:1"
+    ) is not None
+
+
+# Here start the tests to the output and compressed files
+
+@pytest.mark.parametrize("mv_avg", [
+    {"date": "2018-12-26 18:11:00", "average_delivery_time": 0},
+    {"date": "2018-12-26 18:12:00", "average_delivery_time": 25.5},
+    {"date": "2018-12-26 18:12:00", "client_name": "café \"100%\"", "average_delivery_time_5": 1e-07},
+])
+def test_encode_output_line(mv_avg):
+    """
+    Test if encode_output_line function serializes the output dictionaries exactly like json.dumps.
+    """
+    assert mv_avg_script.encode_output_line(mv_avg) == json.dumps(mv_avg) + "\n"
+
+def test_format_minute():
+    """
+    Test if format_minute function formats the minutes like datetime.strftime.
+    """
+    for minute in [datetime(2018, 12, 26, 18, 11), datetime(2018, 12, 31, 23, 59), datetime(2019, 1, 1, 0, 0)]:
+        assert mv_avg_script.format_minute(minute) == datetime.strftime(minute, "%Y-%m-%d %H:%M:%S")
+
+def test_compressed_input_and_output(tmp_path, dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if gzip compressed input files are read and gzip compressed output files are written.
+    """
+    input_file = tmp_path / "input.json.gz"
+    output_file = tmp_path / "output.json.gz"
+    with open("tests_input_files/test_file.json", "rb") as file:
+        input_file.write_bytes(gzip.compress(file.read()))
+    expected_output = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, 10)
+
+    translations = mv_avg_script.pars_translation_files(str(input_file))
+    list_of_minutes = mv_avg_script.create_list_of_minutes(translations)
+    mv_avg_script.save_output_file(mv_avg_script.calc_moving_average(list_of_minutes, translations, 10), str(output_file))
+
+    assert [json.loads(line) for line in gzip.decompress(output_file.read_bytes()).splitlines()] == expected_output
+
+def test_save_output_file_flush(tmp_path, dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if save_output_file function, with flush, writes each line before the next one is computed.
+    """
+    output_file = tmp_path / "output.json"
+    expected_output = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, 10)
+
+    def moving_averages():
+        for index, mv_avg in enumerate(expected_output):
+            assert len(output_file.read_text().splitlines()) == index
+            yield mv_avg
+
+    assert mv_avg_script.save_output_file(moving_averages(), str(output_file), flush=True) == len(expected_output)
+
+# Here start the tests to confirm that the statistics of a run are collected
+
+def test_main_collects_run_stats(tmp_path, dummy_correct_translation):
+    """
+    Test if main function fills in a RunStats object with the stages of the run and the counters of translations.
+    """
+    stats = mv_avg_script.RunStats()
+    output_file = tmp_path / "output.json"
+    mv_avg_script.main(["tests_input_files/test_file.json", "10", "--output", str(output_file)], stats=stats)
+
+    report = stats.as_dict()
+    assert list(report["stages"]) == ["parse", "list_of_minutes", "moving_average", "write"]
+    assert report["lines_read"] == report["lines_parsed"] == len(dummy_correct_translation) + report["duplicates_dropped"]
+    assert report["records_rejected"] == 0
+    assert report["minutes_emitted"] == len(output_file.read_text().splitlines())
+    assert json.loads(json.dumps(report)) == report
+
+def test_main_reports_rejected_record(tmp_path, capsys):
+    """
+    Test if main function reports the statistics in json, counting the rejected record, when the input file is incorrect.
+    """
+    with pytest.raises(Exception):
+        mv_avg_script.main(
+            ["tests_input_files/test_file_incorrect.json", "10", "--output", str(tmp_path / "output.json"), "--stats", "json"]
+        )
+
+    assert json.loads(capsys.readouterr().err)["records_rejected"] == 1
+
+# Here start the tests to confirm that translations slightly out of order are put back in order
+
+def test_iter_reordered_translations():
+    """
+    Test if iter_reordered_translations function puts back in order the translations within the allowed lateness and
+    drops the later ones.
+    """
+    start = datetime(2018, 12, 26, 18, 11)
+    seconds = [0, 5, 3, 10, 8, 9, 30, 2, 28, 31]
+    translations = [{"timestamp": start + timedelta(seconds=second), "duration": second} for second in seconds]
+
+    reorder_buffer = mv_avg_script.ReorderBuffer(timedelta(seconds=5))
+    reordered = list(mv_avg_script.iter_reordered_translations(translations, reorder_buffer))
+
+    # The translation of the second 2 arrives 28 seconds late
+    assert [translation["duration"] for translation in reordered] == [0, 3, 5, 8, 9, 10, 28, 30, 31]
+    assert reorder_buffer.late == 1
+
+def test_calc_moving_average_with_reorder_buffer(dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if the moving averages of translations slightly out of order match the ones of the ordered translations.
+    """
+    shuffled = [dummy_correct_translation[1], dummy_correct_translation[0]] + dummy_correct_translation[2:]
+    expected_output = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, 10)
+
+    reorder_buffer = mv_avg_script.ReorderBuffer(timedelta(minutes=5))
+    assert list(mv_avg_script.iter_moving_average(mv_avg_script.iter_reordered_translations(shuffled, reorder_buffer), 10)) == expected_output
+    assert reorder_buffer.late == 0
+
+    with pytest.raises(Exception, match="File must be ordered"):
+        list(mv_avg_script.iter_minute_buckets(shuffled))
+
+def test_reorder_buffer_negative_lateness():
+    """
+    Test if ReorderBuffer raises an Exception when the allowed lateness is negative.
+    """
+    with pytest.raises(Exception, match="Allowed lateness must not be negative."):
+        mv_avg_script.ReorderBuffer(timedelta(seconds=-1))
+
+# Here start the tests to confirm that the sparse outputs skip the minutes without translations
+
+def test_iter_sparse_moving_average_run_length(dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if iter_sparse_moving_average function, with run_length, merges the consecutive minutes with the same moving
+    average and matches the dense output once the runs are expanded.
+    """
+    expected_output = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, 10)
+    runs = list(mv_avg_script.iter_sparse_moving_average(
+        mv_avg_script.iter_minute_buckets(dummy_correct_translation), 10, run_length=True
+    ))
+
+    expanded_output = []
+    for run in runs:
+        minute = datetime.strptime(run["from"], "%Y-%m-%d %H:%M:%S")
+        while minute <= datetime.strptime(run["to"], "%Y-%m-%d %H:%M:%S"):
+            expanded_output.append({"date": mv_avg_script.format_minute(minute), "average_delivery_time": run["average_delivery_time"]})
+            minute += timedelta(minutes=1)
+
+    assert expanded_output == expected_output
+    assert len(runs) == len({mv_avg["average_delivery_time"] for mv_avg in expected_output})
+
+def test_iter_sparse_moving_average_skips_gaps():
+    """
+    Test if iter_sparse_moving_average function only writes the minutes with translations inside the window, and skips
+    a gap of a year without going through its minutes.
+    """
+    data = [
+        {"timestamp": datetime(2018, 12, 26, 18, 11, 8), "duration": 20},
+        {"timestamp": datetime(2019, 12, 26, 18, 11, 8), "duration": 40},
+    ]
+
+    sparse_output = list(mv_avg_script.iter_sparse_moving_average(mv_avg_script.iter_minute_buckets(data), 2))
+    assert sparse_output == [
+        {"date": "2018-12-26 18:12:00", "average_delivery_time": 20.0},
+        {"date": "2018-12-26 18:13:00", "average_delivery_time": 20.0},
+        {"date": "2019-12-26 18:12:00", "average_delivery_time": 40.0},
+    ]
+
+    runs = list(mv_avg_script.iter_sparse_moving_average(mv_avg_script.iter_minute_buckets(data), 2, run_length=True))
+    assert runs[2] == {"from": "2018-12-26 18:14:00", "to": "2019-12-26 18:11:00", "average_delivery_time": 0}
+
+# Here start the tests to confirm that the percentiles of the duration are estimated within the requested accuracy
+
+@pytest.mark.parametrize("relative_accuracy", [0.01, 0.05])
+def test_duration_sketch_quantiles(relative_accuracy):
+    """
+    Test if DurationSketch estimates the quantiles within the relative accuracy, also after merging and subtracting
+    another sketch.
+    """
+    mapping = mv_avg_script.SketchMapping(relative_accuracy)
+    durations = [int(1.07 ** exponent) + exponent for exponent in range(200)]
+    sketch = mv_avg_script.DurationSketch(mapping)
+    other_sketch = mv_avg_script.DurationSketch(mapping)
+    for duration in durations:
+        sketch.add(duration)
+        other_sketch.add(duration * 3)
+
+    sketch.merge(other_sketch)
+    sketch.subtract(other_sketch)
+
+    for fraction, estimate in zip([0, 0.5, 0.95, 0.99, 1], sketch.quantiles([0, 0.5, 0.95, 0.99, 1])):
+        exact = sorted(durations)[max(1, math.ceil(fraction * len(durations))) - 1]
+        assert abs(estimate - exact) <= relative_accuracy * exact
+
+def test_sketch_mapping_memory():
+    """
+    Test if SketchMapping keeps one duration per bin, however many different durations it sees, and returns the exact
+    duration of the bins where a single one was seen.
+    """
+    mapping = mv_avg_script.SketchMapping(0.01)
+    for duration in range(1, 100_001):
+        mapping.index(duration)
+    mapping.index(100_000)
+
+    assert len(mapping.bin_durations) <= mapping.index(100_000) + 1
+    assert [mapping.value(mapping.index(duration)) for duration in range(1, 41)] == list(range(1, 41))
+
+def test_calc_moving_average_percentiles(dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if calc_moving_average function adds the percentiles of each window to the moving averages, and if the streaming
+    version returns the same output.
+    """
+    expected_averages = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, 10)
+    output = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, 10, [50, 99])
+
+    assert [{key: mv_avg[key] for key in ("date", "average_delivery_time")} for mv_avg in output] == expected_averages
+    assert output[5] == {"date": "2018-12-26 18:16:00", "average_delivery_time": 25.5, "p50_delivery_time": 20, "p99_delivery_time": 31}
+    assert list(mv_avg_script.iter_moving_average(dummy_correct_translation, 10, [99, 50])) == output
+
+def test_calc_moving_average_wrong_percentiles(dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if calc_moving_average function raises an Exception when a percentile is not between 0 and 100.
+    """
+    with pytest.raises(Exception, match="Percentiles must be between 0 and 100."):
+        mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, 10, [50, 101])
+
+# Here start the tests to confirm that the in-memory index answers moving average queries like the main workflow
+
+def test_translation_index_query(dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if TranslationIndex returns, for every minute, the same moving average as calc_moving_average, also for a client
+    and after adding new translations.
+    """
+    translation_index = mv_avg_script.build_translation_index(dummy_correct_translation, by_client=True)
+
+    assert [translation_index.query(minute, 10) for minute in dummy_list_of_minutes] == mv_avg_script.calc_moving_average(
+        dummy_list_of_minutes, dummy_correct_translation, 10
+    )
+    assert translation_index.query(datetime(2018, 12, 26, 18, 24), [5, 10], "airliberty") == {
+        "date": "2018-12-26 18:24:00", "client_name": "airliberty", "average_delivery_time_5": 0, "average_delivery_time_10": 31.0
+    }
+
+    translation_index.add_lines([
+        '{"timestamp": "2018-12-26 18:25:00.000000","translation_id": "5aa5b2f39f7254a75cc1","source_language": "en","target_language": "fr","client_name": "airliberty","event_name": "translation_delivered","nr_words": 30, "duration": 60}'
+    ])
+    assert translation_index.query(datetime(2018, 12, 26, 18, 35), 10, "airliberty")["average_delivery_time"] == 60.0
+    assert translation_index.query(datetime(2018, 12, 26, 18, 25), 2)["average_delivery_time"] == 57.0
+
+    with pytest.raises(Exception, match="File must be ordered"):
+        translation_index.add(dummy_correct_translation[0])
+
+def test_translation_index_add_lines_atomic(dummy_correct_translation):
+    """
+    Test if TranslationIndex.add_lines leaves the index and the deduplicator unchanged when a line is invalid or out of
+    order, and skips the duplicated lines.
+    """
+    translation_index = mv_avg_script.build_translation_index(dummy_correct_translation, deduplicator=mv_avg_script.ExactDeduplicator())
+    new_line = '{"timestamp": "2018-12-26 18:25:00.000000","translation_id": "5aa5b2f39f7254a75cc1","source_language": "en","target_language": "fr","client_name": "airliberty","event_name": "translation_delivered","nr_words": 30, "duration": 60}'
+    old_line = '{"timestamp": "2018-12-26 18:11:00.000000","translation_id": "5aa5b2f39f7254a75cc2","source_language": "en","target_language": "fr","client_name": "airliberty","event_name": "translation_delivered","nr_words": 30, "duration": 60}'
+
+    for lines in ([new_line, '{"bad": 1}'], [new_line, old_line]):
+        with pytest.raises(Exception):
+            translation_index.add_lines(lines)
+        assert translation_index.query(datetime(2018, 12, 26, 18, 25), 1)["average_delivery_time"] == 0
+        assert translation_index.deduplicator.processed_translations == set()
+
+    assert translation_index.add_lines([new_line, new_line]) == 1
+    assert translation_index.add_lines([new_line]) == 0
+    assert translation_index.deduplicator.duplicates == 2
+    assert translation_index.deduplicator.processed_translations == {"5aa5b2f39f7254a75cc1"}
+    assert translation_index.query(datetime(2018, 12, 26, 18, 25), 1)["average_delivery_time"] == 60.0
+
+def test_index_server(dummy_correct_translation):
+    """
+    Test if the query server answers concurrent HTTP queries and reports invalid ones.
+    """
+    translation_index = mv_avg_script.build_translation_index(dummy_correct_translation)
+
+    async def request(port, target):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        status_line, _, body = response.partition(b"\r\n\r\n")
+        return int(status_line.split()[1]), json.loads(body)
+
+    async def run_queries():
+        server = await mv_avg_script.start_index_server(translation_index, port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await asyncio.gather(
+                request(port, "/average?date=2018-12-26%2018:16:00&window=10"),
+                request(port, "/average?date=2018-12-26%2018:24:00&window=1"),
+                request(port, "/average?date=2018-12-26%2018:24:00&window=0"),
+                request(port, "/average?date=2018-12-26%2018:24:00&window=10&client=taxi-eats"),
+            )
+
+    responses = asyncio.run(run_queries())
+
+    assert responses[0] == (200, {"date": "2018-12-26 18:16:00", "average_delivery_time": 25.5})
+    assert responses[1] == (200, {"date": "2018-12-26 18:24:00", "average_delivery_time": 54.0})
+    assert responses[2] == (400, {"error": "Window size value must be greater than 0."})
+    assert responses[3][0] == 400
+
+# Here start the tests to confirm that several input files are merged by timestamp
+
+def test_pars_translation_files_merged(tmp_path, dummy_correct_translation):
+    """
+    Test if pars_translation_files function merges several input files, some compressed, in timestamp order and drops
+    the translations repeated across files.
+    """
+    with open("tests_input_files/test_file.json") as file:
+        lines = file.read().splitlines()
+    (tmp_path / "node-1.json").write_text(lines[0] + "\n" + lines[2] + "\n")
+    (tmp_path / "node-2.json.gz").write_bytes(gzip.compress((lines[0] + "\n" + lines[1] + "\n").encode()))
+
+    file_paths = mv_avg_script.expand_input_paths(str(tmp_path / "node-*"))
+    deduplicator = mv_avg_script.create_deduplicator()
+
+    assert file_paths == [str(tmp_path / "node-1.json"), str(tmp_path / "node-2.json.gz")]
+    assert mv_avg_script.pars_translation_files(file_paths, deduplicator) == dummy_correct_translation
+    assert deduplicator.duplicates == 1
+
+def test_expand_input_paths_no_match(tmp_path):
+    """
+    Test if expand_input_paths function raises a FileNotFoundError when a glob pattern matches no file.
+    """
+    with pytest.raises(FileNotFoundError):
+        mv_avg_script.expand_input_paths(f"tests_input_files/test_file.json,{tmp_path}/*.json")
+
+def test_main_single_file_glob(tmp_path, dummy_list_of_minutes, dummy_correct_translation):
+    """
+    Test if a glob pattern that matches a single input file can be used with --workers and --cache.
+    """
+    with open("tests_input_files/test_file.json", "rb") as file:
+        (tmp_path / "node-1.json").write_bytes(file.read())
+    expected_output = mv_avg_script.calc_moving_average(dummy_list_of_minutes, dummy_correct_translation, 10)
+
+    for option in ["--workers=2", "--cache"]:
+        output_file = tmp_path / "output.json"
+        mv_avg_script.main([str(tmp_path / "node-*.json"), "10", option, "--output", str(output_file)])
+
+        assert [json.loads(line) for line in output_file.read_text().splitlines()] == expected_output
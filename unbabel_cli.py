@@ -1,8 +1,66 @@
+import asyncio
+import bisect
+import glob
+import gzip
+import hashlib
+import heapq
+import io
 import json
+import math
+import mmap
 import time
 from datetime import datetime, timedelta
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
 import argparse
+import cProfile
 import os
+import pickle
+import sys
+import urllib.parse
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from itertools import repeat
+from operator import itemgetter
+from typing import Iterator
+
+# NumPy is only needed by the numpy engine, which falls back to the pure Python one when it is not installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# resource, used to report the peak memory of --stats, is only available on Unix
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# zstandard is only needed to read and write .zst files
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Expected keys to be in the dictionaries and their types. The schema is compiled once into the constants below, so
+# check_translation_fields does not rebuild it for every translation
+TRANSLATION_SCHEMA = {
+    "timestamp": str,
+    "translation_id": str,
+    "source_language": str,
+    "target_language": str,
+    "client_name": str,
+    "event_name": str,
+    "nr_words": int,
+    "duration": int,
+}
+TRANSLATION_KEYS = frozenset(TRANSLATION_SCHEMA)
+TRANSLATION_FIELD_TYPES = tuple(TRANSLATION_SCHEMA.items())
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+EPOCH = datetime(1970, 1, 1)
 
 def check_translation_fields(translation_data: dict) -> str:
     """
@@ -14,89 +72,552 @@ def check_translation_fields(translation_data: dict) -> str:
     Returns:
         boolean: A flag that indicates if the sample has the expected format.
     """
-    # Expected keys to be in the dictionaries
-    expected_keys= [
-        "timestamp",
-        "translation_id",
-        "source_language",
-        "target_language",
-        "client_name",
-        "event_name",
-        "nr_words",
-        "duration"
-    ]
-
-    # Types of the expected keys
-    expected_types= [
-        str,
-        str,
-        str,
-        str,
-        str,
-        str,
-        int,
-        int
-    ]
-
-    variables_types = list(zip(expected_keys, expected_types))
+    # Fast path: a single pass over the fields when the keys are exactly the expected ones and the values have exactly
+    # the expected types, which is the case for every correct translation
+    if translation_data.keys() == TRANSLATION_KEYS:
+        for key, expected_type in TRANSLATION_FIELD_TYPES:
+            if type(translation_data[key]) is not expected_type:
+                break
+        else:
+            return True
 
     # Check all fields from the translation and see if one is not expected 
     for key in translation_data.keys():
-        if key not in expected_keys:
+        if key not in TRANSLATION_KEYS:
             raise Exception(f"""Field "{key}" is not expected in the translation data. Please correct input.""")
     
     # Check if all mandatory fields are on the file 
-    for key in expected_keys:
-        if key not in translation_data.keys():
+    for key in TRANSLATION_SCHEMA:
+        if key not in translation_data:
             raise Exception(f"""Field "{key}" is missing in the translation data. Please correct the input.""")
     
     # If translation has all the correct fields, will check if the fields have the expected types
-    for key, expected_type in variables_types:
+    for key, expected_type in TRANSLATION_FIELD_TYPES:
         value = translation_data[key]
         if not isinstance(value, expected_type):
             raise Exception(f"""Type of the field "{key}" is not the expected one: received "{type(value)}", expected "{expected_type}".""")
         
     return True
 
-def pars_translation_files(file_path: str) -> list[dict]:
+@lru_cache(maxsize=1024)
+def parse_timestamp_minute(minute_prefix: str) -> datetime:
     """
-    Reads input file containing the translations information, parse it and returns a list with a dictionary
-    for each translation delivered. Also, it removes duplicated translations(same translation id).
+    Parses the "Year-Month-Day Hours:Minutes" prefix of a timestamp. The result is cached, since the translations of
+    the same minute share the prefix.
 
     Parameters:
-        file _path (str): Path to the json file containing information for each translation.
+        minute_prefix (str): the first 16 characters of the timestamp.
 
     Returns:
-        list[dict]: List with a dictionary for each translation.
+        datetime: the minute of the timestamp.
+    """
+    return datetime.strptime(minute_prefix, "%Y-%m-%d %H:%M")
+
+def parse_timestamp(timestamp: str) -> datetime:
+    """
+    Converts a timestamp string in the "%Y-%m-%d %H:%M:%S.%f" format into a datetime.datetime. Timestamps with the usual
+    fixed width (two digit seconds and six digit microseconds) are parsed by slicing, using the cached minute of their
+    prefix, and any other timestamp falls back to datetime.strptime.
+
+    Parameters:
+        timestamp (str): the timestamp of the translation.
+
+    Returns:
+        datetime: the parsed timestamp.
+    """
+    if (
+        len(timestamp) == 26
+        and timestamp[16] == ":"
+        and timestamp[19] == "."
+        and timestamp.isascii()
+        and timestamp[17:19].isdigit()
+        and timestamp[20:].isdigit()
+    ):
+        return parse_timestamp_minute(timestamp[:16]).replace(second=int(timestamp[17:19]), microsecond=int(timestamp[20:]))
+
+    return datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+
+class ExactDeduplicator:
+    """
+    Detects duplicated translations by keeping every translation id already processed in a set.
+    """
+
+    def __init__(self):
+        self.description = "exact"
+        self.processed_translations = set()
+        self.duplicates = 0
+
+    def is_duplicate(self, translation_id: str, timestamp: datetime) -> bool:
+        """
+        Checks if the translation was already processed and registers it otherwise.
+
+        Parameters:
+            translation_id (str): id of the translation.
+            timestamp (datetime): timestamp of the translation.
+
+        Returns:
+            boolean: A flag that indicates if the translation is duplicated.
+        """
+        if translation_id in self.processed_translations:
+            self.duplicates += 1
+            return True
+        self.processed_translations.add(translation_id)
+        return False
+
+    def contains(self, translation_id: str, timestamp: datetime) -> bool:
+        """
+        Checks if the translation was already processed, without registering it.
+
+        Parameters:
+            translation_id (str): id of the translation.
+            timestamp (datetime): timestamp of the translation.
+
+        Returns:
+            boolean: A flag that indicates if the translation would be a duplicate.
+        """
+        return translation_id in self.processed_translations
+
+class TimeScopedDeduplicator:
+    """
+    Detects duplicated translations delivered less than <horizon> minutes apart. Since the translations are ordered by
+    timestamp, the ids older than the horizon are forgotten, so the memory used depends on the horizon and not on the
+    size of the input.
+    """
+
+    def __init__(self, horizon: int):
+        self.description = f"window:{horizon}"
+        self.horizon_delta = timedelta(minutes=horizon)
+        # Timestamp of each translation id inside the horizon
+        self.processed_translations = {}
+        self.recent_translations = deque()
+        self.duplicates = 0
+
+    def is_duplicate(self, translation_id: str, timestamp: datetime) -> bool:
+        """
+        Checks if the translation was already processed inside the horizon and registers it otherwise.
+
+        Parameters:
+            translation_id (str): id of the translation.
+            timestamp (datetime): timestamp of the translation.
+
+        Returns:
+            boolean: A flag that indicates if the translation is duplicated.
+        """
+        # Forget the translations that are older than the horizon
+        oldest_timestamp = timestamp - self.horizon_delta
+        while self.recent_translations and self.recent_translations[0][0] < oldest_timestamp:
+            _, old_translation_id = self.recent_translations.popleft()
+            del self.processed_translations[old_translation_id]
+
+        if translation_id in self.processed_translations:
+            self.duplicates += 1
+            return True
+        self.processed_translations[translation_id] = timestamp
+        self.recent_translations.append((timestamp, translation_id))
+        return False
+
+    def contains(self, translation_id: str, timestamp: datetime) -> bool:
+        """
+        Checks if the translation was already processed inside the horizon, without registering it.
+
+        Parameters:
+            translation_id (str): id of the translation.
+            timestamp (datetime): timestamp of the translation.
+
+        Returns:
+            boolean: A flag that indicates if the translation would be a duplicate.
+        """
+        processed_timestamp = self.processed_translations.get(translation_id)
+        return processed_timestamp is not None and processed_timestamp >= timestamp - self.horizon_delta
+
+class BloomDeduplicator:
+    """
+    Detects duplicated translations with a Bloom filter, which uses a fixed amount of memory for up to <capacity>
+    translations. A translation is never wrongly kept twice, but a new one is wrongly dropped with a probability of
+    about <error_rate>.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        if capacity <= 0:
+            raise Exception("Bloom filter capacity must be greater than 0.")
+        if not 0 < error_rate < 1:
+            raise Exception("Bloom filter error rate must be between 0 and 1.")
+
+        # Optimal number of bits and of hash functions for the expected capacity and error rate
+        self.nr_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.nr_hashes = max(1, round(self.nr_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.nr_bits + 7) // 8)
+        self.description = f"bloom:{self.nr_bits}:{self.nr_hashes}"
+        self.duplicates = 0
+
+    def is_duplicate(self, translation_id: str, timestamp: datetime) -> bool:
+        """
+        Checks if the translation was probably already processed and registers it otherwise.
+
+        Parameters:
+            translation_id (str): id of the translation.
+            timestamp (datetime): timestamp of the translation.
+
+        Returns:
+            boolean: A flag that indicates if the translation is duplicated.
+        """
+        is_new = False
+        for position in self.iter_positions(translation_id):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                is_new = True
+
+        if not is_new:
+            self.duplicates += 1
+        return not is_new
+
+    def contains(self, translation_id: str, timestamp: datetime) -> bool:
+        """
+        Checks if the translation was probably already processed, without registering it.
+
+        Parameters:
+            translation_id (str): id of the translation.
+            timestamp (datetime): timestamp of the translation.
+
+        Returns:
+            boolean: A flag that indicates if the translation would be a duplicate.
+        """
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.iter_positions(translation_id))
+
+    def iter_positions(self, translation_id: str) -> Iterator[int]:
+        """
+        Yields the positions of the bits of a translation id. They are derived from two independent hashes (double
+        hashing).
+
+        Parameters:
+            translation_id (str): id of the translation.
+
+        Returns:
+            Iterator[int]: the position of each of the <nr_hashes> bits.
+        """
+        digest = hashlib.blake2b(translation_id.encode(), digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], "little")
+        second_hash = int.from_bytes(digest[8:], "little") | 1
+
+        for index in range(self.nr_hashes):
+            yield (first_hash + index * second_hash) % self.nr_bits
+
+class NoDeduplicator:
+    """
+    Keeps every translation, e.g. to read input files whose duplicates are only removed after merging them.
+    """
+    description = "none"
+
+    def __init__(self):
+        self.duplicates = 0
+
+    def is_duplicate(self, translation_id: str, timestamp: datetime) -> bool:
+        return False
+
+    def contains(self, translation_id: str, timestamp: datetime) -> bool:
+        return False
+
+DEDUPLICATION_STRATEGIES = ("exact", "window", "bloom")
+
+def create_deduplicator(strategy: str = "exact", horizon: int = 60, capacity: int = 10_000_000, error_rate: float = 0.001):
+    """
+    Creates the object that detects the duplicated translations.
+
+    Parameters:
+        strategy (str): "exact" keeps every id, "window" keeps the ids of the last <horizon> minutes and "bloom" uses a
+            Bloom filter sized for <capacity> translations with a false positive probability of <error_rate>.
+        horizon (int): minutes during which a translation id is remembered by the "window" strategy.
+        capacity (int): expected number of translations for the "bloom" strategy.
+        error_rate (float): probability of dropping a translation that is not duplicated, for the "bloom" strategy.
+
+    Returns:
+        ExactDeduplicator | TimeScopedDeduplicator | BloomDeduplicator: the deduplicator.
+    """
+    if strategy == "exact":
+        return ExactDeduplicator()
+    if strategy == "window":
+        if horizon <= 0:
+            raise Exception("Deduplication horizon must be greater than 0.")
+        return TimeScopedDeduplicator(horizon)
+    if strategy == "bloom":
+        return BloomDeduplicator(capacity, error_rate)
+    raise Exception(f"""Deduplication strategy "{strategy}" is not valid. Choose one of: {", ".join(DEDUPLICATION_STRATEGIES)}.""")
+
+def parse_translation_line(line: str) -> dict:
+    """
+    Parses one line of the input file, checks its fields and converts its timestamp.
+
+    Parameters:
+        line (str | bytes): a translation in json format.
+
+    Returns:
+        dict: the translation, with the timestamp converted to datetime.datetime.
+    """
+    data = json.loads(line)
+    # If the format of the translation is not correct, raises an Exception and stops the script.
+    check_translation_fields(data)
+    try:
+        # Transform the timestamp string into a datetime.datetime type in order to facilitate the manipulation of data.
+        data["timestamp"] = parse_timestamp(data["timestamp"])
+    except ValueError:
+        raise ValueError("Timestamp field must be in this format: Year-Month-Day Hours:Minutes:Seconds:Microseconds. \nCorrect the file.")
+
+    return data
+
+def iter_translation_lines(lines, deduplicator=None, stats=None) -> Iterator[dict]:
+    """
+    Parses the lines of an input file one by one and yields a dictionary for each translation delivered, skipping
+    duplicated translations (same translation id).
+
+    Parameters:
+        lines (Iterable[str]): lines of the input file, each containing a translation in json format.
+        deduplicator (optional): object that detects the duplicated translations, as returned by create_deduplicator.
+            By default every translation id is kept in a set.
+        stats (RunStats, optional): statistics of the run, where the lines read and parsed are counted.
+
+    Returns:
+        Iterator[dict]: a dictionary for each translation, with the timestamp converted to datetime.datetime.
+    """
+    if deduplicator is None:
+        deduplicator = ExactDeduplicator()
+
+    if stats is not None:
+        # The counting is kept out of the loop below, so it costs nothing when the statistics are not collected
+        yield from iter_counted_translation_lines(lines, deduplicator, stats)
+        return
+
+    for line in lines:
+        data = parse_translation_line(line)
+        # If it is not a duplicated translation
+        if not deduplicator.is_duplicate(data["translation_id"], data["timestamp"]):
+            yield data
+
+def iter_counted_translation_lines(lines, deduplicator, stats) -> Iterator[dict]:
+    """
+    Version of iter_translation_lines that counts the lines read and parsed in <stats>. A line that is read but not
+    parsed is a rejected record.
+
+    Parameters:
+        lines (Iterable[str]): lines of the input file, each containing a translation in json format.
+        deduplicator: object that detects the duplicated translations, as returned by create_deduplicator.
+        stats (RunStats): statistics of the run.
+
+    Returns:
+        Iterator[dict]: a dictionary for each translation, with the timestamp converted to datetime.datetime.
     """
+    for line in lines:
+        stats.lines_read += 1
+        data = parse_translation_line(line)
+        stats.lines_parsed += 1
+        if not deduplicator.is_duplicate(data["translation_id"], data["timestamp"]):
+            yield data
 
-    loaded_translations:list = []
-    processed_translations = []
+def check_zstandard_installed() -> None:
+    """
+    Checks if the zstandard package, needed to read and write .zst files, is installed.
+    """
+    if zstandard is None:
+        raise Exception("Package zstandard must be installed to read and write .zst files.")
+
+def open_input_file(file_path: str):
+    """
+    Opens an input file for reading text, decompressing it on the fly when its name ends with .gz or .zst.
+
+    Parameters:
+        file_path (str): Path to the input file.
+
+    Returns:
+        TextIO: the opened file.
+    """
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, "rt")
+    if file_path.endswith(".zst"):
+        check_zstandard_installed()
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"), closefd=True))
+    return open(file_path, "r")
+
+def iter_translations(file_path: str, deduplicator=None, stats=None) -> Iterator[dict]:
+    """
+    Reads the input file line by line and yields a dictionary for each translation delivered, without loading the whole
+    file into memory. A file path of "-" reads the translations from the standard input.
+
+    Parameters:
+        file_path (str): Path to the json file containing information for each translation, or "-" for the standard input.
+        deduplicator (optional): object that detects the duplicated translations, as returned by create_deduplicator.
+        stats (RunStats, optional): statistics of the run, where the lines read and parsed are counted.
+
+    Returns:
+        Iterator[dict]: a dictionary for each translation.
+    """
+    if file_path == "-":
+        yield from iter_translation_lines(sys.stdin, deduplicator, stats)
+        return
 
     # Check if the file exists
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"""File "{file_path}" not found. Insert an existing one.""")
 
     # Open the JSON file
-    with open(file_path, "r") as file:
-        for line in file:
-            data = json.loads(line)
-            # If the format of the translation is not correct, raises an Exception and stops the script.
-            # If it is correct, proceeds.
-            correct_format = check_translation_fields(data)
-            if correct_format:
-                # If it is not a duplicated translation
-                if data["translation_id"] not in processed_translations:
-                    # Append translation to the loaded_transaltions list and add the id to the already processed list
-                    loaded_translations.append(data)
-                    processed_translations.append(data["translation_id"])
-                    try:
-                        # Transform the timestamp string into a datetime.datetime type in order to facilitate the manipulation of data.
-                        data["timestamp"] = datetime.strptime(data["timestamp"], "%Y-%m-%d %H:%M:%S.%f")
-                    except ValueError:
-                        raise ValueError("Timestamp field must be in this format: Year-Month-Day Hours:Minutes:Seconds:Microseconds. \nCorrect the file.")
-    
-    return loaded_translations
+    with open_input_file(file_path) as file:
+        yield from iter_translation_lines(file, deduplicator, stats)
+
+def expand_input_paths(path: str) -> list[str]:
+    """
+    Expands the path argument of the script into the paths of the input files. It can be a single file, "-" for the
+    standard input, a glob pattern such as "logs/node-*.json.gz" or several of them separated by commas.
+
+    Parameters:
+        path (str): the path argument.
+
+    Returns:
+        list[str]: the paths of the input files, with the files of each glob pattern in alphabetical order.
+    """
+    if path == "-" or os.path.exists(path):
+        return [path]
+
+    file_paths = []
+    for pattern in path.split(","):
+        if not any(character in pattern for character in "*?["):
+            file_paths.append(pattern)
+            continue
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise FileNotFoundError(f"""No file matches "{pattern}". Insert an existing one.""")
+        file_paths.extend(matches)
+
+    return file_paths
+
+def iter_merged_translations(file_paths: list[str], deduplicator=None, stats=None) -> Iterator[dict]:
+    """
+    Reads several input files, each ordered by timestamp, and yields their translations merged in timestamp order. The
+    files are read in parallel, line by line, and merged with a heap, so the memory used depends on the number of files
+    and not on their size. The duplicates are removed after the merge, so a translation repeated in two files is only
+    kept once, at its first timestamp.
+
+    Parameters:
+        file_paths (list[str]): Paths to the json files containing information for each translation, which can be
+            compressed with gzip or zstandard.
+        deduplicator (optional): object that detects the duplicated translations, as returned by create_deduplicator.
+        stats (RunStats, optional): statistics of the run, where the lines read and parsed are counted.
+
+    Returns:
+        Iterator[dict]: a dictionary for each translation, ordered by timestamp.
+    """
+    if deduplicator is None:
+        deduplicator = ExactDeduplicator()
+
+    if len(file_paths) == 1:
+        return iter_translations(file_paths[0], deduplicator, stats)
+
+    # Check if the files exist before any of them is read
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"""File "{file_path}" not found. Insert an existing one.""")
+
+    # Translations with the same timestamp keep the order of the files
+    merged_translations = heapq.merge(
+        *(iter_translations(file_path, NoDeduplicator(), stats) for file_path in file_paths), key=itemgetter("timestamp")
+    )
+
+    return (
+        translation for translation in merged_translations
+        if not deduplicator.is_duplicate(translation["translation_id"], translation["timestamp"])
+    )
+
+def pars_translation_files(file_path, deduplicator=None, stats=None) -> list[dict]:
+    """
+    Reads input file containing the translations information, parse it and returns a list with a dictionary
+    for each translation delivered. Also, it removes duplicated translations(same translation id).
+
+    Parameters:
+        file _path (str | list[str]): Path to the json file containing information for each translation, or a list of
+            paths to files that are merged in timestamp order (see iter_merged_translations).
+        deduplicator (optional): object that detects the duplicated translations, as returned by create_deduplicator.
+        stats (RunStats, optional): statistics of the run, where the lines read and parsed are counted.
+
+    Returns:
+        list[dict]: List with a dictionary for each translation.
+    """
+    if isinstance(file_path, list):
+        return list(iter_merged_translations(file_path, deduplicator, stats))
+    return list(iter_translations(file_path, deduplicator, stats))
+
+class ReorderBuffer:
+    """
+    Puts back in order translations that arrive slightly out of order, e.g. when the input merges the events of several
+    producers. The watermark is the latest timestamp seen minus the allowed lateness: translations up to the watermark
+    are final and are released in order, and the buffer only holds the ones after it. A translation that arrives
+    behind the watermark is too late to be put back in order, so it is dropped and counted.
+    """
+
+    def __init__(self, allowed_lateness: timedelta):
+        if allowed_lateness < timedelta(0):
+            raise Exception("Allowed lateness must not be negative.")
+
+        self.allowed_lateness = allowed_lateness
+        # Heap of (timestamp, arrival number, translation), the arrival number keeps the order of equal timestamps
+        self.heap = []
+        self.arrivals = 0
+        self.watermark = None
+        self.late = 0
+
+    def push(self, translation: dict) -> list[dict]:
+        """
+        Adds a translation to the buffer and returns the translations that became final.
+
+        Parameters:
+            translation (dict): the translation, with the timestamp converted to datetime.datetime.
+
+        Returns:
+            list[dict]: the final translations, ordered by timestamp.
+        """
+        timestamp = translation["timestamp"]
+        if self.watermark is not None and timestamp < self.watermark:
+            self.late += 1
+            return []
+
+        heapq.heappush(self.heap, (timestamp, self.arrivals, translation))
+        self.arrivals += 1
+        if self.watermark is None or timestamp - self.allowed_lateness > self.watermark:
+            self.watermark = timestamp - self.allowed_lateness
+
+        final_translations = []
+        while self.heap[0][0] <= self.watermark:
+            final_translations.append(heapq.heappop(self.heap)[2])
+            if not self.heap:
+                break
+
+        return final_translations
+
+    def finish(self) -> list[dict]:
+        """
+        Returns the translations left in the buffer, at the end of the input.
+
+        Returns:
+            list[dict]: the remaining translations, ordered by timestamp.
+        """
+        final_translations = [translation for _, _, translation in sorted(self.heap)]
+        self.heap.clear()
+
+        return final_translations
+
+def iter_reordered_translations(data, reorder_buffer: ReorderBuffer) -> Iterator[dict]:
+    """
+    Passes the translations through a ReorderBuffer, so they come out ordered by timestamp. The translations later than
+    the allowed lateness are dropped and counted by the buffer.
+
+    Parameters:
+        data (Iterable[dict]): translations, ordered by timestamp up to the allowed lateness of the buffer.
+        reorder_buffer (ReorderBuffer): the buffer.
+
+    Returns:
+        Iterator[dict]: the translations, ordered by timestamp.
+    """
+    for translation in data:
+        yield from reorder_buffer.push(translation)
+
+    yield from reorder_buffer.finish()
 
 def create_list_of_minutes(data: list[dict]) -> list:
     """
@@ -134,98 +655,2536 @@ def create_list_of_minutes(data: list[dict]) -> list:
 
     return list_of_minutes
 
-def calc_moving_average(list_of_minutes: list, data: list[dict], window_size: int) -> list[dict]:
+class MinuteBucket:
     """
-    Receives a list with a sequence of minutes and computes for each timestamp the moving average of the duration
-    for the last <window_size> minutes. 
-    
+    Aggregated durations of the translations delivered inside one minute.
+
+    A translation delivered at <t> is counted by every minute <m> that satisfies m - window_size <= t <= m. The first minute
+    that counts it is the ceiling of <t> to the minute, which is the key of the bucket. Translations delivered exactly on the
+    minute (zero seconds and microseconds) are still counted window_size minutes later, so their durations are also kept
+    in the "edge" fields.
+    """
+    __slots__ = ("minute", "total", "count", "edge_total", "edge_count")
+
+    def __init__(self, minute: datetime):
+        self.minute = minute
+        self.total = 0
+        self.count = 0
+        self.edge_total = 0
+        self.edge_count = 0
+
+    def add(self, duration: int, on_the_minute: bool) -> None:
+        """
+        Adds the duration of one translation to the bucket.
+
+        Parameters:
+            duration (int): duration of the translation.
+            on_the_minute (bool): flag that indicates if the translation timestamp has zero seconds and microseconds.
+        """
+        self.total += duration
+        self.count += 1
+        if on_the_minute:
+            self.edge_total += duration
+            self.edge_count += 1
+
+    def remove(self, duration: int, on_the_minute: bool) -> None:
+        """
+        Removes the duration of one translation from the bucket, e.g. when it turns out to be duplicated.
+
+        Parameters:
+            duration (int): duration of the translation.
+            on_the_minute (bool): flag that indicates if the translation timestamp has zero seconds and microseconds.
+        """
+        self.total -= duration
+        self.count -= 1
+        if on_the_minute:
+            self.edge_total -= duration
+            self.edge_count -= 1
+
+    def merge(self, other: "MinuteBucket") -> None:
+        """
+        Adds the translations of another bucket of the same minute, e.g. when a minute is split between two chunks.
+
+        Parameters:
+            other (MinuteBucket): the other bucket.
+        """
+        self.total += other.total
+        self.count += other.count
+        self.edge_total += other.edge_total
+        self.edge_count += other.edge_count
+
+def iter_minute_buckets(data, mapping: "SketchMapping" = None) -> Iterator[MinuteBucket]:
+    """
+    Groups the ordered translations into one MinuteBucket per minute, yielding each bucket once the translations of the
+    following minute start. Raises an Exception if a translation belongs to an earlier minute than the previous one.
+
     Parameters:
-        list_of_minutes (list): list with the sequence of timestamps.
-        data (list[dict]): list containing the information of each translation.
-        window_size (int): the number of minutes to be considered in the moving average.
-    
-    Return:
-        list[dict]: list with the moving average of the translations" duration for each timestamp.
+        data (Iterable[dict]): translations ordered by timestamp.
+        mapping (SketchMapping, optional): when given, the buckets are SketchMinuteBucket objects that also keep a
+            sketch of the durations with this mapping, for the percentiles.
 
+    Returns:
+        Iterator[MinuteBucket]: the buckets, ordered by minute.
     """
-    if window_size <= 0:
-        raise Exception("Window size value must be greater than 0.")
+    one_minute = timedelta(minutes=1)
+    bucket = None
 
-    avg_delivery=[]
+    for data_register in data:
+        timestamp = data_register["timestamp"]
+        minute = timestamp.replace(second=0, microsecond=0)
+        on_the_minute = minute == timestamp
+        # Translations delivered during a minute are only counted from the next one on
+        if not on_the_minute:
+            minute += one_minute
 
-    # Iterates through each timestamp in the sequence of timestamps
-    for minute in list_of_minutes:
+        if bucket is None or bucket.minute != minute:
+            if bucket is not None:
+                if minute < bucket.minute:
+                    raise Exception(
+                        "File must be ordered from the latest translation to the most recent, please correct the input file."
+                    )
+                yield bucket
+            bucket = MinuteBucket(minute) if mapping is None else SketchMinuteBucket(minute, mapping)
+        bucket.add(data_register["duration"], on_the_minute)
 
-        mv_avg = {}
-        samples_counter = 0
-        mv_avg["date"]=minute 
-        total_duration=0
-
-        for data_register in data:
-            # If the data's timestamp is greater than the minute in analysis there is no need to check the following translations,
-            # since it is known that the timestamp will keep increasing
-            if data_register["timestamp"] > minute:
-                total_duration += 0
-                mv_avg["average_delivery_time"]=total_duration
-                break
+    if bucket is not None:
+        yield bucket
+
+class SlidingWindow:
+    """
+    Window of <window_size> minutes over the minute buckets, with a running total duration and number of translations.
+    Each bucket enters and leaves the window once, so sliding it over all the minutes is linear in the number of minutes
+    plus the number of buckets, and it never holds more than window_size + 1 buckets.
+    """
+
+    def __init__(self, window_size: int):
+        self.window_delta = timedelta(minutes=window_size)
+        self.buckets = deque()
+        self.total_duration = 0
+        self.samples_counter = 0
+
+    def push(self, bucket: MinuteBucket) -> None:
+        """
+        Adds a bucket to the window. Buckets must be pushed ordered by minute.
+
+        Parameters:
+            bucket (MinuteBucket): the aggregated translations of one minute.
+        """
+        self.buckets.append(bucket)
+        self.total_duration += bucket.total
+        self.samples_counter += bucket.count
+
+    def totals(self, minute: datetime) -> tuple:
+        """
+        Removes the buckets that are too old for <minute> and returns the total duration and number of translations
+        inside the window. Every bucket up to <minute> must have been pushed and minutes must be increasing.
+
+        Parameters:
+            minute (datetime): the minute in analysis.
+
+        Returns:
+            tuple: the total duration and the number of translations inside the window.
+        """
+        lower_bound = minute - self.window_delta
+        edge_bucket = None
+
+        while self.buckets and self.buckets[0].minute <= lower_bound:
+            old_bucket = self.buckets.popleft()
+            self.total_duration -= old_bucket.total
+            self.samples_counter -= old_bucket.count
+            # The translations delivered exactly on the lower bound are still counted
+            if old_bucket.minute == lower_bound:
+                edge_bucket = old_bucket
+
+        if edge_bucket is None:
+            return self.total_duration, self.samples_counter
+        return self.total_duration + edge_bucket.edge_total, self.samples_counter + edge_bucket.edge_count
+
+class SketchMapping:
+    """
+    Mapping between durations and the bins of a DurationSketch, in the spirit of DDSketch. A duration d >= 1 goes to the
+    bin ceil(log(d) / log(gamma)), with gamma = (1 + relative_accuracy) / (1 - relative_accuracy), and every duration
+    of a bin is within <relative_accuracy> of the value of the bin. Durations below 1 go to a bin of their own, with
+    value 0. The value of a bin where a single duration was seen is that duration, so small durations are estimated
+    exactly. Only one duration is kept per bin, so the memory grows with the number of bins and not with the number of
+    different durations.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise Exception("Percentile relative accuracy must be between 0 and 1.")
+
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        # The duration seen in each bin, or None if several were seen
+        self.bin_durations = {}
+
+    def index(self, duration) -> int:
+        """
+        Returns the bin of a duration.
+
+        Parameters:
+            duration (int): the duration.
+
+        Returns:
+            int: the bin, -1 for durations below 1.
+        """
+        index = math.ceil(math.log(duration) / self.log_gamma) if duration >= 1 else -1
+        if self.bin_durations.setdefault(index, duration) != duration:
+            self.bin_durations[index] = None
+        return index
+
+    def value(self, index: int) -> float:
+        """
+        Returns the value of a bin, within <relative_accuracy> of every duration in it.
+
+        Parameters:
+            index (int): the bin.
+
+        Returns:
+            float: the value of the bin.
+        """
+        duration = self.bin_durations.get(index)
+        if duration is not None:
+            return duration
+        if index < 0:
+            return 0
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+class DurationSketch:
+    """
+    Mergeable sketch of a set of durations, from which any percentile can be estimated within the relative accuracy of
+    its SketchMapping. It only keeps a counter per bin, so its memory grows with log(max duration) / log(gamma) and not
+    with the number of durations, e.g. less than 600 bins for durations up to 100000 with a 1% accuracy. The counters
+    can be added and subtracted, so a window can keep a running sketch, like SlidingWindow keeps a running sum.
+    """
+    __slots__ = ("mapping", "bins", "count")
+
+    def __init__(self, mapping: SketchMapping):
+        self.mapping = mapping
+        self.bins = {}
+        self.count = 0
+
+    def add(self, duration) -> None:
+        """
+        Adds a duration to the sketch.
+
+        Parameters:
+            duration (int): the duration.
+        """
+        index = self.mapping.index(duration)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        self.count += 1
+
+    def remove(self, duration) -> None:
+        """
+        Removes a duration that was added to the sketch.
+
+        Parameters:
+            duration (int): the duration.
+        """
+        index = self.mapping.index(duration)
+        if self.bins[index] == 1:
+            del self.bins[index]
+        else:
+            self.bins[index] -= 1
+        self.count -= 1
+
+    def merge(self, other: "DurationSketch") -> None:
+        """
+        Adds the durations of another sketch with the same mapping.
+
+        Parameters:
+            other (DurationSketch): the other sketch.
+        """
+        bins = self.bins
+        for index, count in other.bins.items():
+            bins[index] = bins.get(index, 0) + count
+        self.count += other.count
+
+    def subtract(self, other: "DurationSketch") -> None:
+        """
+        Removes the durations of another sketch, which were merged into this one.
+
+        Parameters:
+            other (DurationSketch): the other sketch.
+        """
+        bins = self.bins
+        for index, count in other.bins.items():
+            # Empty bins are removed, so the sketch only holds the bins of the durations inside it
+            if bins[index] == count:
+                del bins[index]
             else:
-                # For each translation, checks if the timestamp is inside the window size of the current minute
-                if (minute-timedelta(minutes=window_size) <= data_register["timestamp"] <= minute):
-                    # If yes, adds the duration of the translation and increments the counter to compute the current average delivery time
-                    total_duration += data_register["duration"]
-                    mv_avg["average_delivery_time"]=total_duration
-                    samples_counter += 1
-                else:
-                    # If the duration is not inside the window size, add zero to the total duration
-                    total_duration += 0
-                    mv_avg["average_delivery_time"]=total_duration
-    
-        # Compute the moving average value by dividing the total duration by the total number of samples
-        if samples_counter != 0:
-            mv_avg["average_delivery_time"] = mv_avg["average_delivery_time"]/samples_counter
+                bins[index] -= count
+        self.count -= other.count
+
+    def quantiles(self, fractions: list[float]) -> list:
+        """
+        Estimates the quantiles of the durations in the sketch, with the nearest-rank method: the quantile q is the
+        duration of rank ceil(q * count), starting from 1.
+
+        Parameters:
+            fractions (list[float]): the quantiles, between 0 and 1 and in increasing order, e.g. [0.5, 0.95, 0.99].
 
-        # Transform timestamp into a more readable format
-        mv_avg["date"] = datetime.strftime(mv_avg["date"], "%Y-%m-%d %H:%M:%S") 
+        Returns:
+            list: the estimated duration of each quantile, or 0 for each quantile of an empty sketch.
+        """
+        if self.count == 0:
+            return [0] * len(fractions)
 
-        avg_delivery.append(mv_avg)
+        values = []
+        bins = self.bins
+        indexes = iter(sorted(bins))
+        index = next(indexes)
+        cumulative_count = bins[index]
 
-    return avg_delivery
+        for fraction in fractions:
+            # The tolerance keeps e.g. 0.95 * 100 from rounding up to the rank 96
+            rank = max(1, math.ceil(fraction * self.count - 1e-9))
+            while cumulative_count < rank:
+                index = next(indexes)
+                cumulative_count += bins[index]
+            values.append(self.mapping.value(index))
 
-def save_output_file(data: list[dict]) -> None:
+        return values
+
+class SketchMinuteBucket(MinuteBucket):
+    """
+    MinuteBucket that also keeps a sketch of the durations of its translations, and of the ones delivered exactly on
+    the minute, for the percentiles.
     """
-    Receives as input the list of dictionaries and saves it in a json file.
+    __slots__ = ("sketch", "edge_sketch")
 
-    Parameters:
-        data (list[dict]): list with a dictionary for each timestamp moving average.
+    def __init__(self, minute: datetime, mapping: SketchMapping):
+        super().__init__(minute)
+        self.sketch = DurationSketch(mapping)
+        self.edge_sketch = DurationSketch(mapping)
+
+    def add(self, duration: int, on_the_minute: bool) -> None:
+        super().add(duration, on_the_minute)
+        self.sketch.add(duration)
+        if on_the_minute:
+            self.edge_sketch.add(duration)
+
+    def remove(self, duration: int, on_the_minute: bool) -> None:
+        super().remove(duration, on_the_minute)
+        self.sketch.remove(duration)
+        if on_the_minute:
+            self.edge_sketch.remove(duration)
+
+    def merge(self, other: "SketchMinuteBucket") -> None:
+        super().merge(other)
+        self.sketch.merge(other.sketch)
+        self.edge_sketch.merge(other.edge_sketch)
+
+class SketchSlidingWindow(SlidingWindow):
+    """
+    SlidingWindow over SketchMinuteBucket objects that also keeps a running sketch of the durations inside the window.
+    The sketch of each bucket is merged when the bucket enters the window and subtracted when it leaves, so the
+    percentiles of each minute are estimated without sorting the durations of the window.
     """
-    # Path to save the JSON file
-    json_file_path = "output_file.json"
 
-    # Save the list of dictionaries to a JSON file
-    with open(json_file_path, "w") as json_file:
-        for dictionary in data:
-            json.dump(dictionary, json_file)
-            json_file.write("\n") 
+    def __init__(self, window_size: int, mapping: SketchMapping, fractions: list[float]):
+        super().__init__(window_size)
+        self.sketch = DurationSketch(mapping)
+        self.fractions = fractions
+
+    def push(self, bucket: SketchMinuteBucket) -> None:
+        super().push(bucket)
+        self.sketch.merge(bucket.sketch)
+
+    def totals(self, minute: datetime) -> tuple:
+        """
+        Version of SlidingWindow.totals that also returns the estimated percentiles of the durations inside the window.
+
+        Parameters:
+            minute (datetime): the minute in analysis.
+
+        Returns:
+            tuple: the total duration, the number of translations and the list of percentiles inside the window.
+        """
+        lower_bound = minute - self.window_delta
+        edge_bucket = None
+
+        while self.buckets and self.buckets[0].minute <= lower_bound:
+            old_bucket = self.buckets.popleft()
+            self.total_duration -= old_bucket.total
+            self.samples_counter -= old_bucket.count
+            self.sketch.subtract(old_bucket.sketch)
+            # The translations delivered exactly on the lower bound are still counted
+            if old_bucket.minute == lower_bound:
+                edge_bucket = old_bucket
+
+        if edge_bucket is None or edge_bucket.edge_count == 0:
+            return self.total_duration, self.samples_counter, self.sketch.quantiles(self.fractions)
 
-def main():
+        self.sketch.merge(edge_bucket.edge_sketch)
+        percentiles = self.sketch.quantiles(self.fractions)
+        self.sketch.subtract(edge_bucket.edge_sketch)
+
+        return self.total_duration + edge_bucket.edge_total, self.samples_counter + edge_bucket.edge_count, percentiles
+
+def check_window_sizes(window_size) -> list[int]:
     """
-    Define main script
+    Validates the window size argument, which can be a single number of minutes or a list of them.
+
+    Parameters:
+        window_size (int | list[int]): the number of minutes to be considered in the moving average, or a list of them.
+
+    Returns:
+        list[int]: the different window sizes, in the given order.
     """
-    # Define the arguments to define when calling for the script
+    window_sizes = [window_size] if isinstance(window_size, int) else list(dict.fromkeys(window_size))
+
+    if not window_sizes or any(size <= 0 for size in window_sizes):
+        raise Exception("Window size value must be greater than 0.")
+
+    return window_sizes
+
+def iter_window_totals(list_of_minutes, buckets, window_sizes: list[int], window_factory=SlidingWindow) -> Iterator[tuple]:
+    """
+    Slides one window per window size over the same minute buckets and yields, for each minute, the total duration and
+    number of translations inside each window.
+
+    Parameters:
+        list_of_minutes (Iterable[datetime]): increasing sequence of minutes.
+        buckets (Iterable[MinuteBucket]): buckets ordered by minute, as yielded by iter_minute_buckets.
+        window_sizes (list[int]): the numbers of minutes to be considered in the moving averages.
+        window_factory (callable, optional): creates the window of a window size, SlidingWindow by default.
+
+    Returns:
+        Iterator[tuple]: a (minute, window_totals) tuple for each minute, where window_totals has a
+            (total_duration, samples_counter) tuple for each window size, as returned by the totals of the windows.
+    """
+    windows = [window_factory(window_size) for window_size in window_sizes]
+    buckets = iter(buckets)
+    next_bucket = next(buckets, None)
+
+    for minute in list_of_minutes:
+        # Buckets whose first counted minute has been reached enter the windows
+        while next_bucket is not None and next_bucket.minute <= minute:
+            for window in windows:
+                window.push(next_bucket)
+            next_bucket = next(buckets, None)
+
+        yield minute, [window.totals(minute) for window in windows]
+
+class MovingAverageStream:
+    """
+    State of the streaming moving averages: one SlidingWindow per window size and the next minute to be yielded. The
+    sequence of minutes is generated from the buckets themselves: it starts at the minute of the first translation and
+    ends one minute after the minute of the last one, like create_list_of_minutes. The state only depends on the window
+    sizes, so it can be saved and restored cheaply (see follow_moving_average).
+    """
+
+    def __init__(self, window_sizes: list[int], window_factory=SlidingWindow):
+        self.windows = [window_factory(window_size) for window_size in window_sizes]
+        self.minute = None
+        self.last_bucket = None
+
+    def push(self, bucket: MinuteBucket) -> list[tuple]:
+        """
+        Adds the next bucket to the windows and returns the minutes that became final, i.e. the ones before the bucket.
+
+        Parameters:
+            bucket (MinuteBucket): the bucket, whose minute must be greater than the one of the previous bucket.
+
+        Returns:
+            list[tuple]: a (minute, window_totals) tuple for each final minute, where window_totals has a
+                (total_duration, samples_counter) tuple for each window size.
+        """
+        if self.last_bucket is None:
+            # The first translation is only on the minute if all the translations in its bucket are
+            self.minute = bucket.minute if bucket.edge_count == bucket.count else bucket.minute - timedelta(minutes=1)
+        elif bucket.minute <= self.last_bucket.minute:
+            raise Exception(
+                "File must be ordered from the latest translation to the most recent, please correct the input file."
+            )
+
+        # Every minute before the current bucket is final
+        final_minutes = self.advance(bucket.minute)
+
+        for window in self.windows:
+            window.push(bucket)
+        self.last_bucket = bucket
+
+        return final_minutes
+
+    def advance(self, until_minute: datetime) -> list[tuple]:
+        """
+        Returns the minutes before <until_minute>, which must be known to be final: no bucket of those minutes is missing.
+
+        Parameters:
+            until_minute (datetime): the first minute that is not returned.
+
+        Returns:
+            list[tuple]: a (minute, window_totals) tuple for each final minute.
+        """
+        one_minute = timedelta(minutes=1)
+        final_minutes = []
+
+        while self.minute is not None and self.minute < until_minute:
+            final_minutes.append((self.minute, [window.totals(self.minute) for window in self.windows]))
+            self.minute += one_minute
+
+        return final_minutes
+
+    def finish(self) -> list[tuple]:
+        """
+        Returns the remaining minutes, up to the minute after the minute of the last translation.
+
+        Returns:
+            list[tuple]: a (minute, window_totals) tuple for each remaining minute.
+        """
+        if self.last_bucket is None:
+            return []
+
+        # The last minute is the one after the minute of the last translation
+        last_minute = self.last_bucket.minute + timedelta(minutes=1) if self.last_bucket.edge_count else self.last_bucket.minute
+
+        return self.advance(last_minute + timedelta(minutes=1))
+
+class SparseMovingAverageStream(MovingAverageStream):
+    """
+    Version of MovingAverageStream that returns runs of minutes instead of single minutes. While there are translations
+    inside the windows every minute is its own run, but once every window has drained the empty minutes until the next
+    bucket are returned as a single run, without visiting them. A gap of months between two translations then costs the
+    same as a gap of one minute.
+    """
+
+    def advance(self, until_minute: datetime) -> list[tuple]:
+        """
+        Returns the runs of minutes before <until_minute>, which must be known to be final.
+
+        Parameters:
+            until_minute (datetime): the first minute that is not returned.
+
+        Returns:
+            list[tuple]: a (first_minute, last_minute, window_totals) tuple for each run, where every minute of the run
+                has the same window_totals.
+        """
+        one_minute = timedelta(minutes=1)
+        runs = []
+
+        while self.minute is not None and self.minute < until_minute:
+            window_totals = [window.totals(self.minute) for window in self.windows]
+            runs.append((self.minute, self.minute, window_totals))
+            self.minute += one_minute
+
+            # Without buckets in the windows, every minute until the next bucket is empty
+            if self.minute < until_minute and not any(window.buckets for window in self.windows):
+                runs.append((self.minute, until_minute - one_minute, [(0, 0)] * len(self.windows)))
+                self.minute = until_minute
+
+        return runs
+
+def iter_stream_window_totals(buckets, window_sizes: list[int], window_factory=SlidingWindow) -> Iterator[tuple]:
+    """
+    Streaming version of iter_window_totals, where the sequence of minutes is generated from the buckets themselves (see
+    MovingAverageStream). A minute is yielded as soon as the bucket of a later minute arrives, so the output starts
+    before all the translations have been read.
+
+    Parameters:
+        buckets (Iterable[MinuteBucket]): buckets ordered by minute, as yielded by iter_minute_buckets.
+        window_sizes (list[int]): the numbers of minutes to be considered in the moving averages.
+        window_factory (callable, optional): creates the window of a window size, SlidingWindow by default.
+
+    Returns:
+        Iterator[tuple]: a (minute, window_totals) tuple for each minute, as in iter_window_totals.
+    """
+    stream = MovingAverageStream(window_sizes, window_factory)
+
+    for bucket in buckets:
+        yield from stream.push(bucket)
+
+    yield from stream.finish()
+
+def average_output_keys(window_size) -> list[str]:
+    """
+    Returns the keys of the moving averages in the output dictionaries: "average_delivery_time" for a single window
+    size, or "average_delivery_time_<window size>" for each window size when a list of them is given.
+
+    Parameters:
+        window_size (int | list[int]): the window size argument.
+
+    Returns:
+        list[str]: a key for each window size.
+    """
+    if isinstance(window_size, int):
+        return ["average_delivery_time"]
+    return [f"average_delivery_time_{size}" for size in check_window_sizes(window_size)]
+
+def check_percentiles(percentiles: list[float]) -> list[float]:
+    """
+    Checks the requested percentiles and returns them in increasing order, without repetitions.
+
+    Parameters:
+        percentiles (list[float]): the percentiles, e.g. [50, 95, 99].
+
+    Returns:
+        list[float]: the ordered percentiles.
+    """
+    if not percentiles or any(not 0 <= percentile <= 100 for percentile in percentiles):
+        raise Exception("Percentiles must be between 0 and 100.")
+
+    return sorted(set(percentiles))
+
+def percentile_output_keys(window_size, percentiles: list[float]) -> list[list[str]]:
+    """
+    Returns the keys of the percentiles in the output dictionaries: "p<percentile>_delivery_time" for a single window
+    size, or "p<percentile>_delivery_time_<window size>" for each window size when a list of them is given.
+
+    Parameters:
+        window_size (int | list[int]): the window size argument.
+        percentiles (list[float]): the ordered percentiles, as returned by check_percentiles.
+
+    Returns:
+        list[list[str]]: the keys of the percentiles of each window size.
+    """
+    if isinstance(window_size, int):
+        return [[f"p{percentile:g}_delivery_time" for percentile in percentiles]]
+    return [
+        [f"p{percentile:g}_delivery_time_{size}" for percentile in percentiles] for size in check_window_sizes(window_size)
+    ]
+
+def create_sketch_window_factory(percentiles: list[float], mapping: "SketchMapping"):
+    """
+    Returns a function that creates a SketchSlidingWindow for a window size, estimating the given percentiles.
+
+    Parameters:
+        percentiles (list[float]): the ordered percentiles, as returned by check_percentiles.
+        mapping (SketchMapping): the mapping of the sketches of the buckets.
+
+    Returns:
+        callable: the window factory, to be used by iter_window_totals or MovingAverageStream.
+    """
+    fractions = [percentile / 100 for percentile in percentiles]
+
+    return lambda window_size: SketchSlidingWindow(window_size, mapping, fractions)
+
+MINUTE_SUFFIXES = tuple(f"{minute:02d}:00" for minute in range(60))
+
+@lru_cache(maxsize=1024)
+def format_hour(year: int, month: int, day: int, hour: int) -> str:
+    """
+    Formats the "Year-Month-Day Hours:" prefix shared by the 60 minutes of an hour. The result is cached.
+
+    Returns:
+        str: the prefix of the minutes of the hour.
+    """
+    return f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:"
+
+def format_minute(minute: datetime) -> str:
+    """
+    Formats a minute like datetime.strftime(minute, "%Y-%m-%d %H:%M:%S"), from the cached prefix of its hour and a
+    precomputed suffix, which is several times faster.
+
+    Parameters:
+        minute (datetime): the minute, with zero seconds and microseconds.
+
+    Returns:
+        str: the formatted minute.
+    """
+    return format_hour(minute.year, minute.month, minute.day, minute.hour) + MINUTE_SUFFIXES[minute.minute]
+
+def format_moving_average(minute: datetime, window_totals: list[tuple], average_keys: list[str], group: dict = None) -> dict:
+    """
+    Builds the output dictionary of one minute.
+
+    Parameters:
+        minute (datetime): the minute in analysis.
+        window_totals (list[tuple]): the total duration and the number of translations inside each window.
+        average_keys (list[str]): the output key of each window, as returned by average_output_keys.
+        group (dict, optional): the values of the fields of the group, when the translations are grouped.
+
+    Returns:
+        dict: the minute and the moving average of the translations' duration for each window.
+    """
+    mv_avg = {}
+
+    # Transform timestamp into a more readable format
+    mv_avg["date"] = format_minute(minute)
+
+    if group is not None:
+        mv_avg.update(group)
+
+    for average_key, (total_duration, samples_counter) in zip(average_keys, window_totals):
+        # Compute the moving average value by dividing the total duration by the total number of samples
+        if samples_counter != 0:
+            mv_avg[average_key] = total_duration/samples_counter
+        else:
+            mv_avg[average_key] = 0
+
+    return mv_avg
+
+def format_moving_average_percentiles(
+    minute: datetime, window_totals: list[tuple], average_keys: list[str], percentile_keys: list[list[str]]
+) -> dict:
+    """
+    Builds the output dictionary of one minute with the moving averages and the percentiles of each window.
+
+    Parameters:
+        minute (datetime): the minute in analysis.
+        window_totals (list[tuple]): the total duration, the number of translations and the percentiles inside each
+            window, as returned by SketchSlidingWindow.totals.
+        average_keys (list[str]): the output key of the average of each window, as returned by average_output_keys.
+        percentile_keys (list[list[str]]): the output keys of the percentiles of each window, as returned by
+            percentile_output_keys.
+
+    Returns:
+        dict: the minute, the moving average of the translations' duration and its percentiles for each window.
+    """
+    mv_avg = format_moving_average(minute, [(total, count) for total, count, _ in window_totals], average_keys)
+
+    for keys, (_, _, percentiles) in zip(percentile_keys, window_totals):
+        mv_avg.update(zip(keys, percentiles))
+
+    return mv_avg
+
+def calc_moving_average(
+    list_of_minutes: list, data: list[dict], window_size, percentiles: list[float] = None, relative_accuracy: float = 0.01
+) -> list[dict]:
+    """
+    Receives a list with a sequence of minutes and computes for each timestamp the moving average of the duration
+    for the last <window_size> minutes. 
+    
+    Parameters:
+        list_of_minutes (list): list with the sequence of timestamps.
+        data (list[dict]): list containing the information of each translation.
+        window_size (int | list[int]): the number of minutes to be considered in the moving average. When a list is
+            given, the moving averages of every window size are computed in the same pass.
+        percentiles (list[float], optional): percentiles of the duration to be estimated for each window too, e.g.
+            [50, 95, 99]. They are merged from a sketch of each minute (see DurationSketch).
+        relative_accuracy (float): relative accuracy of the percentiles. A lower one uses more memory.
+    
+    Return:
+        list[dict]: list with the moving average of the translations" duration for each timestamp.
+
+    """
+    window_sizes = check_window_sizes(window_size)
+    average_keys = average_output_keys(window_size)
+
+    if percentiles:
+        percentiles = check_percentiles(percentiles)
+        percentile_keys = percentile_output_keys(window_size, percentiles)
+        mapping = SketchMapping(relative_accuracy)
+        window_totals = iter_window_totals(
+            list_of_minutes, iter_minute_buckets(data, mapping), window_sizes, create_sketch_window_factory(percentiles, mapping)
+        )
+        return [
+            format_moving_average_percentiles(minute, totals, average_keys, percentile_keys) for minute, totals in window_totals
+        ]
+
+    # The translations are aggregated per minute and a window slides over those aggregates, so each translation is only
+    # visited once instead of once per minute
+    window_totals = iter_window_totals(list_of_minutes, iter_minute_buckets(data), window_sizes)
+
+    return [format_moving_average(minute, totals, average_keys) for minute, totals in window_totals]
+
+def iter_moving_average(data, window_size, percentiles: list[float] = None, relative_accuracy: float = 0.01) -> Iterator[dict]:
+    """
+    Streaming version of create_list_of_minutes and calc_moving_average. The translations are consumed one by one and the
+    moving average of each minute is yielded as soon as that minute is final, so the memory used depends on the window
+    size and not on the number of translations.
+
+    Parameters:
+        data (Iterable[dict]): translations ordered by timestamp, e.g. as yielded by iter_translations.
+        window_size (int | list[int]): the number of minutes to be considered in the moving average, or a list of them.
+        percentiles (list[float], optional): percentiles of the duration to be estimated for each window too.
+        relative_accuracy (float): relative accuracy of the percentiles.
+
+    Returns:
+        Iterator[dict]: the moving average of the translations' duration for each minute.
+    """
+    if not percentiles:
+        return iter_bucket_moving_average(iter_minute_buckets(data), window_size)
+
+    mapping = SketchMapping(relative_accuracy)
+    return iter_bucket_moving_average(iter_minute_buckets(data, mapping), window_size, percentiles, mapping)
+
+def iter_bucket_moving_average(buckets, window_size, percentiles: list[float] = None, mapping: SketchMapping = None) -> Iterator[dict]:
+    """
+    Computes the moving average of each minute from the minute buckets, e.g. as returned by pars_translation_chunks. The
+    minutes go from the minute of the first translation to the minute after the last one, like create_list_of_minutes.
+
+    Parameters:
+        buckets (Iterable[MinuteBucket]): buckets ordered by minute.
+        window_size (int | list[int]): the number of minutes to be considered in the moving average, or a list of them.
+        percentiles (list[float], optional): percentiles of the duration to be estimated for each window too. The
+            buckets must then be SketchMinuteBucket objects.
+        mapping (SketchMapping, optional): the mapping of the sketches of the buckets, needed with <percentiles>.
+
+    Returns:
+        Iterator[dict]: the moving average of the translations' duration for each minute.
+    """
+    # Checked before any bucket is read, instead of when the first minute is requested
+    window_sizes = check_window_sizes(window_size)
+    average_keys = average_output_keys(window_size)
+
+    if percentiles:
+        percentiles = check_percentiles(percentiles)
+        percentile_keys = percentile_output_keys(window_size, percentiles)
+        window_totals = iter_stream_window_totals(buckets, window_sizes, create_sketch_window_factory(percentiles, mapping))
+        return (
+            format_moving_average_percentiles(minute, totals, average_keys, percentile_keys) for minute, totals in window_totals
+        )
+
+    window_totals = iter_stream_window_totals(buckets, window_sizes)
+
+    return (format_moving_average(minute, totals, average_keys) for minute, totals in window_totals)
+
+OUTPUT_FORMATS = ("dense", "sparse", "runs")
+
+def iter_sparse_moving_average(buckets, window_size, run_length: bool = False) -> Iterator[dict]:
+    """
+    Sparse version of iter_bucket_moving_average, whose work depends on the number of minutes with translations inside
+    the windows and not on the length of the gaps between them (see SparseMovingAverageStream). The minutes without
+    translations inside any window are not written. With <run_length>, the consecutive minutes with the same moving
+    averages, including the empty ones, are written as a single run instead:
+    {"from": "2018-12-26 18:24:00", "to": "2018-12-28 09:10:00", "average_delivery_time": 0}.
+
+    Parameters:
+        buckets (Iterable[MinuteBucket]): buckets ordered by minute.
+        window_size (int | list[int]): the number of minutes to be considered in the moving average, or a list of them.
+        run_length (bool): flag that indicates if the minutes are written as runs.
+
+    Returns:
+        Iterator[dict]: the moving average of each minute with translations, or of each run of minutes.
+    """
+    # Checked before any bucket is read, instead of when the first minute is requested
+    window_sizes = check_window_sizes(window_size)
+    average_keys = average_output_keys(window_size)
+
+    stream = SparseMovingAverageStream(window_sizes)
+
+    def iter_runs() -> Iterator[tuple]:
+        for bucket in buckets:
+            yield from stream.push(bucket)
+        yield from stream.finish()
+
+    if not run_length:
+        return (
+            format_moving_average(first_minute, window_totals, average_keys)
+            for first_minute, _, window_totals in iter_runs()
+            if any(samples_counter for _, samples_counter in window_totals)
+        )
+    return iter_moving_average_runs(iter_runs(), average_keys)
+
+def iter_moving_average_runs(runs, average_keys: list[str]) -> Iterator[dict]:
+    """
+    Merges the consecutive runs of minutes with the same moving averages and yields an output dictionary for each merged
+    run.
+
+    Parameters:
+        runs (Iterable[tuple]): (first_minute, last_minute, window_totals) tuples of consecutive minutes, as returned by
+            SparseMovingAverageStream.
+        average_keys (list[str]): the output key of each window, as returned by average_output_keys.
+
+    Returns:
+        Iterator[dict]: the first and last minute of each run and its moving average for each window.
+    """
+    first_minute = last_minute = averages = None
+
+    for run_first_minute, run_last_minute, window_totals in runs:
+        run_averages = [
+            total_duration / samples_counter if samples_counter != 0 else 0
+            for total_duration, samples_counter in window_totals
+        ]
+        if run_averages == averages:
+            last_minute = run_last_minute
+            continue
+
+        if averages is not None:
+            yield {"from": format_minute(first_minute), "to": format_minute(last_minute), **dict(zip(average_keys, averages))}
+        first_minute, last_minute, averages = run_first_minute, run_last_minute, run_averages
+
+    if averages is not None:
+        yield {"from": format_minute(first_minute), "to": format_minute(last_minute), **dict(zip(average_keys, averages))}
+
+GROUP_BY_FIELDS = ("client_name", "source_language", "target_language", "event_name")
+
+def check_group_by_fields(group_by: list[str]) -> list[str]:
+    """
+    Validates the fields used to group the translations.
+
+    Parameters:
+        group_by (list[str]): the names of the fields.
+
+    Returns:
+        list[str]: the different fields, in the given order.
+    """
+    group_by = list(dict.fromkeys(group_by))
+
+    if not group_by:
+        raise Exception(f"""At least one field must be given to group the translations. Choose from: {", ".join(GROUP_BY_FIELDS)}.""")
+    for field in group_by:
+        if field not in GROUP_BY_FIELDS:
+            raise Exception(f"""Field "{field}" cannot be used to group the translations. Choose from: {", ".join(GROUP_BY_FIELDS)}.""")
+
+    return group_by
+
+class GroupWindows:
+    """
+    State of the moving averages of one group: the bucket of the minute being aggregated and one SlidingWindow per
+    window size.
+    """
+    __slots__ = ("bucket", "windows")
+
+    def __init__(self, window_sizes: list[int]):
+        self.bucket = None
+        self.windows = [SlidingWindow(window_size) for window_size in window_sizes]
+
+def iter_grouped_window_totals(data, window_sizes: list[int], group_by: list[str]) -> Iterator[tuple]:
+    """
+    Slides, in a single pass, independent windows over the translations of each group with the same values in the
+    <group_by> fields. For each minute, the totals of every group with translations inside its windows are yielded.
+    Groups whose windows are empty are forgotten, so the memory used depends on the number of groups active inside the
+    window and not on the total number of groups.
+
+    Parameters:
+        data (Iterable[dict]): translations ordered by timestamp, e.g. as yielded by iter_translations.
+        window_sizes (list[int]): the numbers of minutes to be considered in the moving averages.
+        group_by (list[str]): the fields used to group the translations, from GROUP_BY_FIELDS.
+
+    Returns:
+        Iterator[tuple]: a (minute, group_values, window_totals) tuple for each minute and active group, where
+            window_totals has a (total_duration, samples_counter) tuple for each window size.
+    """
+    one_minute = timedelta(minutes=1)
+    groups = {}
+    minute = None
+    last_key = None
+
+    def iter_minute_totals(minute):
+        for group_values, group in list(groups.items()):
+            if group.bucket is not None and group.bucket.minute <= minute:
+                for window in group.windows:
+                    window.push(group.bucket)
+                group.bucket = None
+
+            window_totals = [window.totals(minute) for window in group.windows]
+
+            if any(samples_counter for _, samples_counter in window_totals):
+                yield minute, group_values, window_totals
+            elif group.bucket is None:
+                # The group has been idle for longer than every window
+                del groups[group_values]
+
+    for data_register in data:
+        timestamp = data_register["timestamp"]
+        translation_minute = timestamp.replace(second=0, microsecond=0)
+        on_the_minute = translation_minute == timestamp
+        # Translations delivered during a minute are only counted from the next one on
+        key = translation_minute if on_the_minute else translation_minute + one_minute
+
+        if minute is None:
+            minute = translation_minute
+        elif key < last_key:
+            raise Exception(
+                "File must be ordered from the latest translation to the most recent, please correct the input file."
+            )
+        last_key = key
+
+        # Every minute before the current translation is final
+        while minute < key:
+            yield from iter_minute_totals(minute)
+            minute += one_minute
+
+        group_values = tuple(data_register[field] for field in group_by)
+        group = groups.get(group_values)
+        if group is None:
+            group = groups[group_values] = GroupWindows(window_sizes)
+        if group.bucket is None or group.bucket.minute != key:
+            if group.bucket is not None:
+                for window in group.windows:
+                    window.push(group.bucket)
+            group.bucket = MinuteBucket(key)
+        group.bucket.add(data_register["duration"], on_the_minute)
+
+    if last_key is None:
+        return
+
+    # The last minute is the one after the minute of the last translation
+    last_minute = translation_minute + one_minute
+    while minute <= last_minute:
+        yield from iter_minute_totals(minute)
+        minute += one_minute
+
+def iter_grouped_moving_average(data, window_size, group_by: list[str]) -> Iterator[dict]:
+    """
+    Computes the moving averages of each group of translations with the same values in the <group_by> fields. A line is
+    yielded for each minute and group with translations inside the window.
+
+    Parameters:
+        data (Iterable[dict]): translations ordered by timestamp, e.g. as yielded by iter_translations.
+        window_size (int | list[int]): the number of minutes to be considered in the moving average, or a list of them.
+        group_by (list[str]): the fields used to group the translations, from GROUP_BY_FIELDS.
+
+    Returns:
+        Iterator[dict]: the minute, the values of the group fields and the moving averages of each active group.
+    """
+    # Checked before any translation is read, instead of when the first minute is requested
+    window_sizes = check_window_sizes(window_size)
+    average_keys = average_output_keys(window_size)
+    group_by = check_group_by_fields(group_by)
+
+    window_totals = iter_grouped_window_totals(data, window_sizes, group_by)
+
+    return (
+        format_moving_average(minute, totals, average_keys, dict(zip(group_by, group_values)))
+        for minute, group_values, totals in window_totals
+    )
+
+def get_bucket_minute(timestamp: datetime) -> tuple:
+    """
+    Returns the minute of the bucket of a translation, which is the first minute that counts it (see MinuteBucket).
+
+    Parameters:
+        timestamp (datetime): timestamp of the translation.
+
+    Returns:
+        tuple: the minute of the bucket and a flag that indicates if the timestamp has zero seconds and microseconds.
+    """
+    minute = timestamp.replace(second=0, microsecond=0)
+    if minute == timestamp:
+        return minute, True
+    # Translations delivered during a minute are only counted from the next one on
+    return minute + timedelta(minutes=1), False
+
+class FollowState:
+    """
+    Everything follow_moving_average needs to resume after a restart: the windows, the bucket of the minute being
+    aggregated, the deduplicator and the offsets of the input and output files. Its size depends on the window sizes
+    (and on the deduplication strategy), not on the size of the input.
+    """
+
+    def __init__(self, window_sizes: list[int], deduplicator):
+        self.window_sizes = window_sizes
+        self.stream = MovingAverageStream(window_sizes)
+        self.bucket = None
+        self.deduplicator = deduplicator
+        self.input_offset = 0
+        self.output_offset = 0
+
+    def add(self, data: dict) -> list[tuple]:
+        """
+        Adds a translation and returns the minutes that became final.
+
+        Parameters:
+            data (dict): the translation, as returned by parse_translation_line.
+
+        Returns:
+            list[tuple]: a (minute, window_totals) tuple for each final minute, as in MovingAverageStream.push.
+        """
+        if self.deduplicator.is_duplicate(data["translation_id"], data["timestamp"]):
+            return []
+
+        minute, on_the_minute = get_bucket_minute(data["timestamp"])
+        final_minutes = []
+
+        if self.bucket is None or self.bucket.minute != minute:
+            if self.bucket is not None:
+                if minute < self.bucket.minute:
+                    raise Exception(
+                        "File must be ordered from the latest translation to the most recent, please correct the input file."
+                    )
+                # The previous bucket is complete, and so is every minute before the current one
+                final_minutes = self.stream.push(self.bucket) + self.stream.advance(minute)
+            self.bucket = MinuteBucket(minute)
+        self.bucket.add(data["duration"], on_the_minute)
+
+        return final_minutes
+
+def save_checkpoint(state: FollowState, checkpoint_path: str) -> None:
+    """
+    Saves the state of follow_moving_average. The checkpoint is written to a temporary file that then replaces the
+    previous one, so a crash while saving never leaves a corrupted checkpoint.
+
+    Parameters:
+        state (FollowState): the state to save.
+        checkpoint_path (str): Path to the checkpoint file.
+    """
+    temporary_path = f"{checkpoint_path}.tmp"
+
+    with open(temporary_path, "wb") as checkpoint_file:
+        pickle.dump(state, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, checkpoint_path)
+
+def load_checkpoint(checkpoint_path: str) -> FollowState:
+    """
+    Loads the state saved by save_checkpoint.
+
+    Parameters:
+        checkpoint_path (str): Path to the checkpoint file.
+
+    Returns:
+        FollowState: the saved state.
+    """
+    with open(checkpoint_path, "rb") as checkpoint_file:
+        return pickle.load(checkpoint_file)
+
+def follow_moving_average(
+    file_path: str,
+    window_size,
+    output_path: str = "output_file.json",
+    checkpoint_path: str = None,
+    deduplicator=None,
+    checkpoint_interval: float = 10.0,
+    poll_interval: float = 1.0,
+    idle_timeout: float = None,
+) -> None:
+    """
+    Follows an append-only input file, like "tail -f", and appends the moving average of each minute to the output file
+    as soon as that minute is final. The state is saved to <checkpoint_path> every <checkpoint_interval> seconds and
+    when the function returns, so a new call resumes from where the previous one stopped without reading the input
+    file again. Output lines written after the last checkpoint are discarded when resuming, since they will be written
+    again.
+
+    Parameters:
+        file_path (str): Path to the json file containing information for each translation.
+        window_size (int | list[int]): the number of minutes to be considered in the moving average, or a list of them.
+        output_path (str): Path to the output file.
+        checkpoint_path (str, optional): Path to the checkpoint file. By default, <file_path>.checkpoint.
+        deduplicator (optional): object that detects the duplicated translations, as returned by create_deduplicator.
+            Ignored when resuming from a checkpoint, which has its own.
+        checkpoint_interval (float): seconds between checkpoints.
+        poll_interval (float): seconds to wait for new translations when the end of the input file is reached.
+        idle_timeout (float, optional): seconds without new translations after which the function returns. By default,
+            it follows the input file forever.
+    """
+    window_sizes = check_window_sizes(window_size)
+    average_keys = average_output_keys(window_size)
+    if checkpoint_path is None:
+        checkpoint_path = f"{file_path}.checkpoint"
+
+    # Check if the file exists
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"""File "{file_path}" not found. Insert an existing one.""")
+
+    if os.path.exists(checkpoint_path):
+        state = load_checkpoint(checkpoint_path)
+        if state.window_sizes != window_sizes:
+            raise Exception(f"""Checkpoint "{checkpoint_path}" was created with different window sizes.""")
+        if os.path.getsize(file_path) < state.input_offset:
+            raise Exception(f"""File "{file_path}" is smaller than in checkpoint "{checkpoint_path}", it must be append-only.""")
+    else:
+        state = FollowState(window_sizes, deduplicator if deduplicator is not None else ExactDeduplicator())
+
+    # Discard the output written after the checkpoint
+    with open(output_path, "a") as output_file:
+        output_file.truncate(state.output_offset)
+
+    with open(file_path, "rb") as input_file, open(output_path, "a") as output_file:
+        input_file.seek(state.input_offset)
+        last_checkpoint = time.monotonic()
+        idle_since = None
+
+        while True:
+            line = input_file.readline()
+
+            if line.endswith(b"\n"):
+                state.input_offset += len(line)
+                idle_since = None
+
+                final_minutes = state.add(parse_translation_line(line))
+                if final_minutes:
+                    for minute, window_totals in final_minutes:
+                        output_file.write(encode_output_line(format_moving_average(minute, window_totals, average_keys)))
+                    output_file.flush()
+            else:
+                # End of the file or a line that is still being written: wait for the rest
+                input_file.seek(state.input_offset)
+                now = time.monotonic()
+                if idle_since is None:
+                    idle_since = now
+                elif idle_timeout is not None and now - idle_since >= idle_timeout:
+                    break
+                time.sleep(poll_interval)
+
+            if time.monotonic() - last_checkpoint >= checkpoint_interval:
+                state.output_offset = output_file.tell()
+                save_checkpoint(state, checkpoint_path)
+                last_checkpoint = time.monotonic()
+
+        state.output_offset = output_file.tell()
+        save_checkpoint(state, checkpoint_path)
+
+def find_chunk_boundaries(file_path: str, nr_chunks: int) -> list[tuple]:
+    """
+    Splits the input file into byte ranges of about the same size, each starting at the beginning of a line.
+
+    Parameters:
+        file_path (str): Path to the json file containing information for each translation.
+        nr_chunks (int): the number of ranges.
+
+    Returns:
+        list[tuple]: the (start, end) offsets of each non-empty range, in order.
+    """
+    file_size = os.path.getsize(file_path)
+    boundaries = [0]
+
+    with open(file_path, "rb") as file:
+        for chunk in range(1, nr_chunks):
+            # Move the boundary to the start of the next line. Reading from the previous byte keeps a boundary that
+            # already is at the start of a line.
+            file.seek(max(file_size * chunk // nr_chunks - 1, boundaries[-1]))
+            file.readline()
+            boundaries.append(min(file.tell(), file_size))
+    boundaries.append(file_size)
+
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+def create_chunk_deduplicator(deduplicator):
+    """
+    Creates an empty deduplicator of the same strategy for the translations of one chunk of pars_translation_chunks. A
+    Bloom filter is replaced by a set, which is small for a chunk and also detects every duplicate the filter detects.
+    The window strategy only remembers the ids it keeps, so removing its duplicates inside each chunk and then across
+    the chunks would not be the same as a single pass: every translation of a chunk is kept, and they are all checked
+    by the main process.
+
+    Parameters:
+        deduplicator: object that detects the duplicated translations of the whole file, as returned by
+            create_deduplicator.
+
+    Returns:
+        ExactDeduplicator | NoDeduplicator: the deduplicator of the chunk.
+    """
+    if isinstance(deduplicator, (NoDeduplicator, TimeScopedDeduplicator)):
+        return NoDeduplicator()
+    return ExactDeduplicator()
+
+def parse_translation_chunk(file_path: str, start: int, end: int, deduplicator=None, with_timestamps: bool = False) -> tuple:
+    """
+    Parses the translations inside a byte range of the input file, removes the ones duplicated inside the range and
+    aggregates the others into minute buckets. This is the work done by each process of pars_translation_chunks, so
+    the ids of the translations kept are also returned, with compact arrays, for the main process to remove the
+    duplicates across chunks. The order is only checked by the main process once they are removed, since a duplicate
+    may be older than the translation before it.
+
+    Parameters:
+        file_path (str): Path to the json file containing information for each translation.
+        start (int): offset of the first byte of the range, at the start of a line.
+        end (int): offset after the last byte of the range, at the start of a line or at the end of the file.
+        deduplicator (optional): empty object that detects the duplicated translations inside the range, as returned by
+            create_chunk_deduplicator. By default, every translation is kept.
+        with_timestamps (bool): flag that indicates if the timestamps are returned, for the window strategy.
+
+    Returns:
+        tuple: the number of lines parsed, the buckets, in the order of their first translation, a flag that indicates
+            if the translations kept are ordered, and for the translations kept, the list of ids, the array of their
+            buckets (the index of the bucket times 2, plus 1 when the translation is on the minute), the array of their
+            durations and, only with <with_timestamps>, the array of their timestamps in microseconds since the epoch.
+    """
+    with open(file_path, "rb") as file:
+        file.seek(start)
+        lines = file.read(end - start).splitlines()
+
+    translations = [parse_translation_line(line) for line in lines]
+    nr_lines = len(translations)
+
+    # The duplicates are removed before the order is checked, like in pars_translation_files
+    if deduplicator is not None:
+        translations = [
+            data for data in translations if not deduplicator.is_duplicate(data["translation_id"], data["timestamp"])
+        ]
+
+    # Same grouping as iter_minute_buckets, also keeping the bucket of each translation
+    one_minute = timedelta(minutes=1)
+    buckets = []
+    bucket_indexes = {}
+    bucket_positions = array("q")
+    is_ordered = True
+    previous_minute = None
+    for data in translations:
+        timestamp = data["timestamp"]
+        minute = timestamp.replace(second=0, microsecond=0)
+        on_the_minute = minute == timestamp
+        if not on_the_minute:
+            minute += one_minute
+
+        if minute != previous_minute:
+            if previous_minute is not None and minute < previous_minute:
+                is_ordered = False
+            previous_minute = minute
+        bucket_index = bucket_indexes.get(minute)
+        if bucket_index is None:
+            bucket_index = bucket_indexes[minute] = len(buckets)
+            buckets.append(MinuteBucket(minute))
+        buckets[bucket_index].add(data["duration"], on_the_minute)
+        bucket_positions.append(2 * bucket_index + on_the_minute)
+
+    translation_ids = [data["translation_id"] for data in translations]
+    durations = [data["duration"] for data in translations]
+    try:
+        durations = array("q", durations)
+    except OverflowError:
+        # Durations that do not fit in 64 bits are sent as a list
+        pass
+    timestamps = None
+    if with_timestamps:
+        timestamps = array("q", [(data["timestamp"] - EPOCH) // timedelta(microseconds=1) for data in translations])
+
+    return nr_lines, buckets, is_ordered, translation_ids, bucket_positions, durations, timestamps
+
+def pars_translation_chunks(file_path: str, workers: int, deduplicator=None, stats=None) -> list[MinuteBucket]:
+    """
+    Parallel version of pars_translation_files and iter_minute_buckets. The input file is split into chunks aligned to
+    the lines, which are parsed, validated, deduplicated and aggregated per minute by a pool of <workers> processes.
+    The buckets of the chunks are then merged in order, removing the duplicated translations across chunks, so the
+    result is the same as aggregating the whole file in a single process.
+
+    Parameters:
+        file_path (str): Path to the json file containing information for each translation.
+        workers (int): the number of processes.
+        deduplicator (optional): object that detects the duplicated translations, as returned by create_deduplicator.
+        stats (RunStats, optional): statistics of the run, where the lines read and parsed are counted.
+
+    Returns:
+        list[MinuteBucket]: the buckets of the whole file, ordered by minute.
+    """
+    if workers <= 0:
+        raise Exception("Number of workers must be greater than 0.")
+
+    # Check if the file exists
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"""File "{file_path}" not found. Insert an existing one.""")
+
+    if deduplicator is None:
+        deduplicator = ExactDeduplicator()
+    chunk_deduplicator = create_chunk_deduplicator(deduplicator)
+    nr_chunk_duplicates = 0
+
+    # More chunks than processes, so a slower chunk does not leave the other processes idle
+    chunks = find_chunk_boundaries(file_path, workers * 4)
+
+    merged_buckets = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        with_timestamps = isinstance(deduplicator, TimeScopedDeduplicator)
+        results = executor.map(
+            parse_translation_chunk, repeat(file_path), *zip(*chunks), repeat(chunk_deduplicator), repeat(with_timestamps)
+        ) if chunks else []
+
+        one_microsecond = timedelta(microseconds=1)
+        for nr_lines, buckets, is_ordered, translation_ids, bucket_positions, durations, timestamps in results:
+            if stats is not None:
+                # A chunk with an invalid line raises in its process, so every line of the others was parsed
+                stats.lines_read += nr_lines
+                stats.lines_parsed += nr_lines
+            nr_chunk_duplicates += nr_lines - len(translation_ids)
+
+            # The duplicates across chunks are checked in the order of the file, so the first occurrence of a
+            # translation is kept. Only the window strategy needs the timestamps, the others are given the minute of
+            # the bucket.
+            previous_minute = None
+            for index, translation_id in enumerate(translation_ids):
+                bucket = buckets[bucket_positions[index] >> 1]
+                timestamp = bucket.minute if timestamps is None else EPOCH + timestamps[index] * one_microsecond
+                if deduplicator.is_duplicate(translation_id, timestamp):
+                    bucket.remove(durations[index], bool(bucket_positions[index] & 1))
+                elif not is_ordered:
+                    # Like in pars_translation_files, only the translations kept must be ordered
+                    if previous_minute is not None and bucket.minute < previous_minute:
+                        raise Exception(
+                            "File must be ordered from the latest translation to the most recent, please correct the input file."
+                        )
+                    previous_minute = bucket.minute
+            if not is_ordered:
+                buckets.sort(key=lambda bucket: bucket.minute)
+
+            for bucket in buckets:
+                if bucket.count == 0:
+                    continue
+                if merged_buckets and bucket.minute <= merged_buckets[-1].minute:
+                    # A minute split between two chunks
+                    if bucket.minute < merged_buckets[-1].minute:
+                        raise Exception(
+                            "File must be ordered from the latest translation to the most recent, please correct the input file."
+                        )
+                    merged_buckets[-1].merge(bucket)
+                else:
+                    merged_buckets.append(bucket)
+
+    # The duplicates removed inside the chunks are counted like the ones removed across them
+    deduplicator.duplicates += nr_chunk_duplicates
+
+    return merged_buckets
+
+# Layout of the binary cache of the parsed translations: the magic bytes, the length of a json header and the header,
+# padded to 8 bytes, followed by one fixed-width column per field. The text fields are dictionary encoded.
+CACHE_MAGIC = b"UBCACHE1"
+CACHE_COLUMNS = (
+    ("timestamp", "q"),
+    ("duration", "q"),
+    ("nr_words", "q"),
+    ("client_name", "i"),
+    ("source_language", "i"),
+    ("target_language", "i"),
+    ("event_name", "i"),
+)
+CACHE_DICTIONARY_FIELDS = ("client_name", "source_language", "target_language", "event_name")
+
+def get_file_signature(file_path: str) -> dict:
+    """
+    Returns the size, the modification time and a hash of the content of a file, which identify the version of the
+    input file a cache was built from.
+
+    Parameters:
+        file_path (str): Path to the file.
+
+    Returns:
+        dict: the size, the modification time in nanoseconds and the BLAKE2 hash of the file.
+    """
+    file_stat = os.stat(file_path)
+    file_hash = hashlib.blake2b(digest_size=16)
+
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            file_hash.update(block)
+
+    return {"size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns, "hash": file_hash.hexdigest()}
+
+class TranslationColumns:
+    """
+    Parsed translations stored in fixed-width columns, as read from the binary cache. The columns are memoryviews over
+    the memory-mapped cache file, so nothing is copied until the translations are used.
+    """
+
+    def __init__(self, columns: dict, dictionaries: dict):
+        self.columns = columns
+        self.dictionaries = dictionaries
+
+    def __len__(self) -> int:
+        return len(self.columns["timestamp"])
+
+    def iter_translations(self) -> Iterator[dict]:
+        """
+        Yields a dictionary for each translation, like iter_translations but without the translation id, which is only
+        needed to remove the duplicates before the cache is written.
+
+        Returns:
+            Iterator[dict]: a dictionary for each translation.
+        """
+        one_microsecond = timedelta(microseconds=1)
+        client_names, source_languages, target_languages, event_names = (
+            self.dictionaries[field] for field in CACHE_DICTIONARY_FIELDS
+        )
+
+        for timestamp, duration, nr_words, client_name, source_language, target_language, event_name in zip(
+            *(self.columns[field] for field, _ in CACHE_COLUMNS)
+        ):
+            yield {
+                "timestamp": EPOCH + timestamp * one_microsecond,
+                "source_language": source_languages[source_language],
+                "target_language": target_languages[target_language],
+                "client_name": client_names[client_name],
+                "event_name": event_names[event_name],
+                "nr_words": nr_words,
+                "duration": duration,
+            }
+
+    def to_arrays(self) -> tuple:
+        """
+        Returns the timestamps and the durations as NumPy arrays without copying them, like load_translation_arrays.
+
+        Returns:
+            tuple: the timestamps (datetime64[us] array) and the durations (int64 array) of the translations.
+        """
+        timestamps = np.frombuffer(self.columns["timestamp"], dtype=np.int64).view("datetime64[us]")
+        durations = np.frombuffer(self.columns["duration"], dtype=np.int64)
+
+        return timestamps, durations
+
+def write_translation_cache(cache_path: str, translations: list[dict], signature: dict, deduplicator) -> None:
+    """
+    Writes the binary cache of the parsed translations. The cache is written to a temporary file that then replaces
+    the previous one, so it is never read half written.
+
+    Parameters:
+        cache_path (str): Path to the cache file.
+        translations (list[dict]): the parsed translations, without duplicates.
+        signature (dict): the signature of the input file, as returned by get_file_signature.
+        deduplicator: the object that removed the duplicated translations.
+    """
+    dictionaries = {field: {} for field in CACHE_DICTIONARY_FIELDS}
+
+    try:
+        columns = [
+            array("q", [(data["timestamp"] - EPOCH) // timedelta(microseconds=1) for data in translations]),
+            array("q", [data["duration"] for data in translations]),
+            array("q", [data["nr_words"] for data in translations]),
+        ]
+    except OverflowError:
+        raise Exception("Fields duration and nr_words must fit in 64 bits to be cached.")
+    for field in CACHE_DICTIONARY_FIELDS:
+        codes = dictionaries[field]
+        columns.append(array("i", [codes.setdefault(data[field], len(codes)) for data in translations]))
+
+    header = json.dumps({
+        "source": signature,
+        "deduplication": deduplicator.description,
+        "duplicates": deduplicator.duplicates,
+        "count": len(translations),
+        "dictionaries": {field: list(codes) for field, codes in dictionaries.items()},
+    }).encode()
+    # The columns start at a multiple of 8 bytes, so they can be memory-mapped as 64-bit integers
+    header += b" " * (-(len(CACHE_MAGIC) + 4 + len(header)) % 8)
+
+    temporary_path = f"{cache_path}.tmp"
+    with open(temporary_path, "wb") as cache_file:
+        cache_file.write(CACHE_MAGIC)
+        cache_file.write(len(header).to_bytes(4, "little"))
+        cache_file.write(header)
+        for column in columns:
+            column.tofile(cache_file)
+            # The 32-bit columns are padded so the next column is still aligned
+            cache_file.write(b"\0" * (-column.itemsize * len(column) % 8))
+    os.replace(temporary_path, cache_path)
+
+def read_translation_cache(cache_path: str, signature: dict, deduplication: str) -> tuple:
+    """
+    Memory-maps the binary cache of the parsed translations, if it was built from the same version of the input file
+    and with the same deduplication strategy.
+
+    Parameters:
+        cache_path (str): Path to the cache file.
+        signature (dict): the signature of the input file, as returned by get_file_signature.
+        deduplication (str): the description of the deduplicator, e.g. "window:60".
+
+    Returns:
+        tuple: the cached translations (TranslationColumns) and the number of duplicates removed when the cache was
+            written, or None if there is no valid cache.
+    """
+    if not os.path.exists(cache_path):
+        return None
+
+    with open(cache_path, "rb") as cache_file:
+        if cache_file.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+            return None
+        header_size = int.from_bytes(cache_file.read(4), "little")
+        header = json.loads(cache_file.read(header_size))
+        if header["source"] != signature or header["deduplication"] != deduplication:
+            return None
+        # The mapping stays valid after the file is closed
+        mapping = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    count = header["count"]
+    offset = len(CACHE_MAGIC) + 4 + header_size
+    columns = {}
+    for field, typecode in CACHE_COLUMNS:
+        itemsize = array(typecode).itemsize
+        columns[field] = memoryview(mapping)[offset:offset + itemsize * count].cast(typecode)
+        offset += itemsize * count + (-itemsize * count % 8)
+
+    return TranslationColumns(columns, header["dictionaries"]), header["duplicates"]
+
+def pars_translation_files_cached(file_path: str, deduplicator=None, cache_path: str = None, stats=None) -> TranslationColumns:
+    """
+    Version of pars_translation_files that keeps a binary cache of the parsed translations next to the input file. The
+    first call parses the input file and writes the cache, and the following ones memory-map it instead of parsing the
+    file again, as long as the size, the modification time and the content of the input file do not change.
+
+    Parameters:
+        file_path (str): Path to the json file containing information for each translation.
+        deduplicator (optional): object that detects the duplicated translations, as returned by create_deduplicator.
+        cache_path (str, optional): Path to the cache file. By default, <file_path>.cache.
+        stats (RunStats, optional): statistics of the run, where the lines read and parsed are counted. Nothing is
+            read when the cache is used.
+
+    Returns:
+        TranslationColumns: the parsed translations.
+    """
+    if deduplicator is None:
+        deduplicator = ExactDeduplicator()
+    if cache_path is None:
+        cache_path = f"{file_path}.cache"
+
+    # Check if the file exists
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"""File "{file_path}" not found. Insert an existing one.""")
+
+    signature = get_file_signature(file_path)
+    cache = read_translation_cache(cache_path, signature, deduplicator.description)
+    if cache is not None:
+        cached_translations, duplicates = cache
+        # The duplicates were removed when the cache was written
+        deduplicator.duplicates += duplicates
+        return cached_translations
+
+    translations = pars_translation_files(file_path, deduplicator, stats)
+    write_translation_cache(cache_path, translations, signature, deduplicator)
+    cached_translations, _ = read_translation_cache(cache_path, signature, deduplicator.description)
+
+    return cached_translations
+
+class PrefixSumIndex:
+    """
+    Index of the minute buckets of a set of translations, which returns the total duration and the number of
+    translations of any window ending at any minute in O(log n), with n the number of minutes with translations. The
+    minutes of the buckets are kept in order next to the prefix sums of their totals and counts, so a window is the
+    difference between two prefix sums found by binary search. The durations of the translations delivered exactly on
+    the minute, still counted at the lower bound of the window (see MinuteBucket), are kept per bucket.
+    """
+
+    def __init__(self):
+        # Minutes since the epoch of each bucket, and prefix sums starting with 0
+        self.minutes = []
+        self.prefix_totals = [0]
+        self.prefix_counts = [0]
+        self.edge_totals = []
+        self.edge_counts = []
+
+    def add(self, minute: int, duration: int, on_the_minute: bool) -> None:
+        """
+        Adds a translation to the index. Translations must be added ordered by timestamp, and adding one to the last
+        bucket or to a new bucket only updates the end of the index.
+
+        Parameters:
+            minute (int): minutes since the epoch of the bucket of the translation.
+            duration (int): duration of the translation.
+            on_the_minute (bool): flag that indicates if the translation timestamp has zero seconds and microseconds.
+        """
+        if not self.minutes or minute > self.minutes[-1]:
+            self.minutes.append(minute)
+            self.prefix_totals.append(self.prefix_totals[-1])
+            self.prefix_counts.append(self.prefix_counts[-1])
+            self.edge_totals.append(0)
+            self.edge_counts.append(0)
+        elif minute < self.minutes[-1]:
+            raise Exception(
+                "File must be ordered from the latest translation to the most recent, please correct the input file."
+            )
+
+        self.prefix_totals[-1] += duration
+        self.prefix_counts[-1] += 1
+        if on_the_minute:
+            self.edge_totals[-1] += duration
+            self.edge_counts[-1] += 1
+
+    def totals(self, minute: int, window_size: int) -> tuple:
+        """
+        Returns the total duration and the number of translations inside the window of <window_size> minutes ending at
+        <minute>, like SlidingWindow.totals.
+
+        Parameters:
+            minute (int): minutes since the epoch of the minute in analysis.
+            window_size (int): the number of minutes of the window.
+
+        Returns:
+            tuple: the total duration and the number of translations inside the window.
+        """
+        lower_bound = minute - window_size
+        # Buckets up to <minute> are inside the window, except the ones up to its lower bound
+        end = bisect.bisect_right(self.minutes, minute)
+        start = bisect.bisect_right(self.minutes, lower_bound, 0, end)
+
+        total_duration = self.prefix_totals[end] - self.prefix_totals[start]
+        samples_counter = self.prefix_counts[end] - self.prefix_counts[start]
+
+        # The translations delivered exactly on the lower bound are still counted
+        if start > 0 and self.minutes[start - 1] == lower_bound:
+            total_duration += self.edge_totals[start - 1]
+            samples_counter += self.edge_counts[start - 1]
+
+        return total_duration, samples_counter
+
+class TranslationIndex:
+    """
+    In-memory index of the translations that answers moving average queries for any minute and window size, optionally
+    for a single client, without going through the translations again (see PrefixSumIndex). New translations can be
+    added at any time, as long as they are not older than the ones already added.
+    """
+
+    def __init__(self, by_client: bool = False, deduplicator=None):
+        self.index = PrefixSumIndex()
+        self.by_client = by_client
+        self.client_indexes = {}
+        self.deduplicator = deduplicator if deduplicator is not None else ExactDeduplicator()
+
+    def add(self, translation: dict) -> None:
+        """
+        Adds a parsed translation to the index, e.g. as returned by pars_translation_files.
+
+        Parameters:
+            translation (dict): the translation, with the timestamp converted to datetime.datetime.
+        """
+        minute, on_the_minute = get_bucket_minute(translation["timestamp"])
+        minute = (minute - EPOCH) // timedelta(minutes=1)
+
+        self.index.add(minute, translation["duration"], on_the_minute)
+        if self.by_client:
+            client_index = self.client_indexes.get(translation["client_name"])
+            if client_index is None:
+                client_index = self.client_indexes[translation["client_name"]] = PrefixSumIndex()
+            client_index.add(minute, translation["duration"], on_the_minute)
+
+    def add_lines(self, lines) -> int:
+        """
+        Parses lines in the format of the input file and adds their translations to the index, skipping the duplicated
+        ones. The lines are added all or none: every line is parsed and checked first, so if one of them is invalid or
+        out of order, an Exception is raised and neither the index nor the deduplicator change.
+
+        Parameters:
+            lines (Iterable[str]): lines with a translation in json format each.
+
+        Returns:
+            int: the number of translations added.
+        """
+        translations = [parse_translation_line(line) for line in lines if line.strip()]
+
+        # The duplicates are found without registering the ids, in case the lines are rejected
+        new_translations = []
+        new_translation_ids = set()
+        last_minute = self.index.minutes[-1] if self.index.minutes else None
+        for translation in translations:
+            translation_id = translation["translation_id"]
+            if translation_id in new_translation_ids or self.deduplicator.contains(translation_id, translation["timestamp"]):
+                continue
+
+            minute = (get_bucket_minute(translation["timestamp"])[0] - EPOCH) // timedelta(minutes=1)
+            if last_minute is not None and minute < last_minute:
+                raise Exception(
+                    "File must be ordered from the latest translation to the most recent, please correct the input file."
+                )
+            last_minute = minute
+            new_translations.append(translation)
+            new_translation_ids.add(translation_id)
+
+        # Every line is valid, so the ids are registered and the new translations added
+        for translation in translations:
+            if translation["translation_id"] in new_translation_ids:
+                self.deduplicator.is_duplicate(translation["translation_id"], translation["timestamp"])
+            else:
+                self.deduplicator.duplicates += 1
+        for translation in new_translations:
+            self.add(translation)
+
+        return len(new_translations)
+
+    def query(self, minute: datetime, window_size, client_name: str = None) -> dict:
+        """
+        Computes the moving average of a minute, like calc_moving_average.
+
+        Parameters:
+            minute (datetime): the minute in analysis. Seconds and microseconds are ignored.
+            window_size (int | list[int]): the number of minutes to be considered in the moving average, or a list of them.
+            client_name (str, optional): computes the moving average of the translations of this client only.
+
+        Returns:
+            dict: the output dictionary of the minute, with the client when one is given.
+        """
+        window_sizes = check_window_sizes(window_size)
+        average_keys = average_output_keys(window_size)
+        minute = minute.replace(second=0, microsecond=0)
+
+        index = self.index
+        group = None
+        if client_name is not None:
+            if not self.by_client:
+                raise Exception("The index was not built by client, so it cannot be filtered by client.")
+            # A client without translations has an empty index
+            index = self.client_indexes.get(client_name, PrefixSumIndex())
+            group = {"client_name": client_name}
+
+        minutes = (minute - EPOCH) // timedelta(minutes=1)
+        window_totals = [index.totals(minutes, size) for size in window_sizes]
+
+        return format_moving_average(minute, window_totals, average_keys, group)
+
+def build_translation_index(translations, by_client: bool = False, deduplicator=None) -> TranslationIndex:
+    """
+    Builds a TranslationIndex from translations ordered by timestamp.
+
+    Parameters:
+        translations (Iterable[dict]): the parsed translations, e.g. as returned by pars_translation_files.
+        by_client (bool): flag that indicates if an index is also built for each client.
+        deduplicator (optional): object that detected the duplicated translations, also used for the ones added later.
+
+    Returns:
+        TranslationIndex: the index.
+    """
+    translation_index = TranslationIndex(by_client, deduplicator)
+    for translation in translations:
+        translation_index.add(translation)
+
+    return translation_index
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+def handle_index_request(translation_index: TranslationIndex, method: str, target: str, body: bytes) -> tuple:
+    """
+    Answers a request to the query server:
+
+    * GET /average?date=2018-12-26 18:12:00&window=30[&client=airliberty] returns the moving average of a minute, in
+      the format of the output file. Several comma separated windows can be given;
+    * POST /translations with lines in the format of the input file adds their translations to the index.
+
+    Parameters:
+        translation_index (TranslationIndex): the index.
+        method (str): the HTTP method.
+        target (str): the path and query string of the request.
+        body (bytes): the body of the request.
+
+    Returns:
+        tuple: the HTTP status and the dictionary of the json response.
+    """
+    url = urllib.parse.urlsplit(target)
+    params = urllib.parse.parse_qs(url.query)
+
+    try:
+        if url.path == "/average":
+            if method != "GET":
+                return 405, {"error": "Use GET to query the index."}
+            if "date" not in params or "window" not in params:
+                return 400, {"error": "Parameters date and window are required."}
+            window_size = parse_window_sizes(params["window"][0])
+            if len(window_size) == 1:
+                window_size = window_size[0]
+            minute = datetime.fromisoformat(params["date"][0])
+            client_name = params["client"][0] if "client" in params else None
+            return 200, translation_index.query(minute, window_size, client_name)
+
+        if url.path == "/translations":
+            if method != "POST":
+                return 405, {"error": "Use POST to add translations."}
+            nr_translations = translation_index.add_lines(body.decode().splitlines())
+            return 200, {"added": nr_translations}
+    except Exception as error:
+        return 400, {"error": str(error)}
+
+    return 404, {"error": f"""Path "{url.path}" not found, use /average or /translations."""}
+
+async def handle_index_connection(translation_index: TranslationIndex, reader, writer) -> None:
+    """
+    Reads an HTTP request from a connection to the query server, answers it and closes the connection. The index is
+    only used between two awaits, so concurrent requests never see it half updated.
+
+    Parameters:
+        translation_index (TranslationIndex): the index.
+        reader (asyncio.StreamReader): the reader of the connection.
+        writer (asyncio.StreamWriter): the writer of the connection.
+    """
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        content_length = 0
+        while True:
+            header = (await reader.readline()).decode("latin-1").strip()
+            if not header:
+                break
+            name, _, value = header.partition(":")
+            if name.strip().lower() == "content-length":
+                content_length = int(value)
+        body = await reader.readexactly(content_length) if content_length else b""
+
+        if len(request_line) != 3:
+            status, response = 400, {"error": "Invalid HTTP request."}
+        else:
+            status, response = handle_index_request(translation_index, request_line[0], request_line[1], body)
+
+        response_body = json.dumps(response).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(response_body)}\r\nConnection: close\r\n\r\n".encode() + response_body
+        )
+        await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        # The client closed the connection or sent a malformed request
+        pass
+    finally:
+        writer.close()
+
+async def start_index_server(translation_index: TranslationIndex, host: str = "127.0.0.1", port: int = 8080, unix_socket: str = None):
+    """
+    Starts the query server on a TCP port or on a Unix socket.
+
+    Parameters:
+        translation_index (TranslationIndex): the index.
+        host (str): the address to listen on.
+        port (int): the TCP port, or 0 for any free one.
+        unix_socket (str, optional): path of a Unix socket to listen on instead of the TCP port.
+
+    Returns:
+        asyncio.Server: the started server.
+    """
+    def handle_connection(reader, writer):
+        return handle_index_connection(translation_index, reader, writer)
+
+    if unix_socket is not None:
+        return await asyncio.start_unix_server(handle_connection, path=unix_socket)
+    return await asyncio.start_server(handle_connection, host, port)
+
+def serve_translation_index(translation_index: TranslationIndex, host: str = "127.0.0.1", port: int = 8080, unix_socket: str = None) -> None:
+    """
+    Runs the query server until it is interrupted.
+
+    Parameters:
+        translation_index (TranslationIndex): the index.
+        host (str): the address to listen on.
+        port (int): the TCP port.
+        unix_socket (str, optional): path of a Unix socket to listen on instead of the TCP port.
+    """
+    async def serve():
+        server = await start_index_server(translation_index, host, port, unix_socket)
+        address = unix_socket if unix_socket is not None else "http://%s:%d" % server.sockets[0].getsockname()[:2]
+        print(f"Serving queries on {address}, stop it with Ctrl+C.", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+def load_translation_arrays(data: list[dict]) -> tuple:
+    """
+    Loads the timestamps and the durations of the translations into contiguous NumPy arrays, to be used by the numpy
+    engine.
+
+    Parameters:
+        data (list[dict]): list containing the information of each translation.
+
+    Returns:
+        tuple: the timestamps (datetime64[us] array) and the durations (int64 array) of the translations.
+    """
+    # Converting the datetimes to integer epoch microseconds is much faster than letting NumPy convert each datetime
+    one_microsecond = timedelta(microseconds=1)
+    timestamps = np.fromiter(
+        ((data_register["timestamp"] - EPOCH) // one_microsecond for data_register in data), dtype=np.int64, count=len(data)
+    ).view("datetime64[us]")
+    durations = np.fromiter((data_register["duration"] for data_register in data), dtype=np.int64, count=len(data))
+
+    return timestamps, durations
+
+def create_list_of_minutes_numpy(timestamps) -> "np.ndarray":
+    """
+    NumPy version of create_list_of_minutes, which returns the sequence of minutes as a datetime64[m] array.
+
+    Parameters:
+        timestamps (np.ndarray): the timestamps of the translations, as returned by load_translation_arrays.
+
+    Return:
+        np.ndarray: the sequence of minutes, from the minute of the first translation to the minute after the last one.
+    """
+    min_time = timestamps[0].astype("datetime64[m]")
+    max_time = timestamps[-1].astype("datetime64[m]") + 1
+
+    # Check if file is ordered in the expected way: from the latest to most recent translation
+    if min_time > max_time:
+        raise Exception(
+            "File must be ordered from the latest translation to the most recent, please correct the input file."
+        )
+
+    return np.arange(min_time, max_time + 1)
+
+def calc_moving_average_numpy(list_of_minutes, timestamps, durations, window_size) -> list[dict]:
+    """
+    NumPy version of calc_moving_average. The translations are keyed by the first minute that counts them (see
+    MinuteBucket) and the totals of each window are differences of cumulative sums, whose bounds are found with
+    searchsorted, so there is no Python loop over the translations or the minutes.
+
+    Parameters:
+        list_of_minutes (np.ndarray): the sequence of minutes, as returned by create_list_of_minutes_numpy.
+        timestamps (np.ndarray): the timestamps of the translations, as returned by load_translation_arrays.
+        durations (np.ndarray): the durations of the translations, as returned by load_translation_arrays.
+        window_size (int | list[int]): the number of minutes to be considered in the moving average, or a list of them.
+
+    Return:
+        list[dict]: list with the moving average of the translations' duration for each timestamp.
+    """
+    window_sizes = check_window_sizes(window_size)
+    average_keys = average_output_keys(window_size)
+
+    minutes = np.asarray(list_of_minutes, dtype="datetime64[m]")
+    minute_indexes = minutes.astype(np.int64)
+
+    # Translations delivered during a minute are only counted from the next one on
+    translation_minutes = timestamps.astype("datetime64[m]")
+    on_the_minute = translation_minutes == timestamps
+    keys = translation_minutes.astype(np.int64) + ~on_the_minute
+
+    # Check if file is ordered in the expected way, like iter_minute_buckets: the keys must not decrease
+    if np.any(keys[1:] < keys[:-1]):
+        raise Exception(
+            "File must be ordered from the latest translation to the most recent, please correct the input file."
+        )
+
+    # The cumulative sums are shared by every window size
+    cumulative_duration = np.concatenate(([0], np.cumsum(durations)))
+    upper = np.searchsorted(keys, minute_indexes, side="right")
+    edge_keys = keys[on_the_minute]
+    cumulative_edge_duration = np.concatenate(([0], np.cumsum(durations[on_the_minute])))
+
+    columns = [np.datetime_as_string(minutes.astype("datetime64[s]")).tolist()]
+    for size in window_sizes:
+        lower_bounds = minute_indexes - size
+
+        # Translations with a key inside ]minute - window_size, minute]
+        lower = np.searchsorted(keys, lower_bounds, side="right")
+        total_duration = cumulative_duration[upper] - cumulative_duration[lower]
+        samples_counter = upper - lower
+
+        # Translations delivered exactly on the lower bound of the window are still counted
+        edge_upper = np.searchsorted(edge_keys, lower_bounds, side="right")
+        edge_lower = np.searchsorted(edge_keys, lower_bounds, side="left")
+        total_duration += cumulative_edge_duration[edge_upper] - cumulative_edge_duration[edge_lower]
+        samples_counter += edge_upper - edge_lower
+
+        averages = (total_duration / np.maximum(samples_counter, 1)).tolist()
+        columns.append([average if counter else 0 for average, counter in zip(averages, samples_counter.tolist())])
+
+    return [
+        {"date": row[0].replace("T", " "), **dict(zip(average_keys, row[1:]))}
+        for row in zip(*columns)
+    ]
+
+def open_output_file(output_path: str):
+    """
+    Opens the output file for writing text, compressing it on the fly when its name ends with .gz or .zst. A path of "-"
+    writes to the standard output.
+
+    Parameters:
+        output_path (str): Path to the output file, or "-" for the standard output.
+
+    Returns:
+        TextIO: the opened file.
+    """
+    if output_path == "-":
+        # The standard output must not be closed after writing
+        return nullcontext(sys.stdout)
+    if output_path.endswith(".gz"):
+        return gzip.open(output_path, "wt")
+    if output_path.endswith(".zst"):
+        check_zstandard_installed()
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(open(output_path, "wb"), closefd=True))
+    return open(output_path, "w", buffering=1 << 20)
+
+OUTPUT_LINE_TEMPLATES = {}
+
+def encode_output_line(mv_avg: dict) -> str:
+    """
+    Serializes an output dictionary into the same json as json.dumps, but faster: the keys are formatted once per set
+    of keys into a template, and only the values are formatted for each line.
+
+    Parameters:
+        mv_avg (dict): the output dictionary of one minute, with str, int or float values.
+
+    Returns:
+        str: the json line, ending with a new line.
+    """
+    keys = tuple(mv_avg)
+    template = OUTPUT_LINE_TEMPLATES.get(keys)
+    if template is None:
+        template = "{" + ", ".join(encode_basestring_ascii(key).replace("%", "%%") + ": %s" for key in keys) + "}\n"
+        OUTPUT_LINE_TEMPLATES[keys] = template
+
+    # json formats the numbers like their repr
+    return template % tuple([
+        encode_basestring_ascii(value) if value.__class__ is str else repr(value) for value in mv_avg.values()
+    ])
+
+def save_output_file(data: list[dict], output_path: str = "output_file.json", batch_size: int = 4096, flush: bool = False) -> int:
+    """
+    Receives as input the list of dictionaries and saves it in a json file. The dictionaries are written as they are
+    iterated, so a generator such as the one returned by iter_moving_average is never fully loaded into memory.
+
+    Parameters:
+        data (Iterable[dict]): list or iterator with a dictionary for each timestamp moving average.
+        output_path (str): Path to the output file, compressed when it ends with .gz or .zst, or "-" for the standard
+            output.
+        batch_size (int): number of lines joined into a single write.
+        flush (bool): flag that indicates if each line is written and flushed as soon as it is computed, instead of in
+            batches, so it can be read while the input is still being processed (e.g. with --stream).
+
+    Returns:
+        int: the number of lines written.
+    """
+    nr_lines = 0
+
+    # Save the list of dictionaries to a JSON file
+    with open_output_file(output_path) as json_file:
+        if flush:
+            for dictionary in data:
+                json_file.write(encode_output_line(dictionary))
+                json_file.flush()
+                nr_lines += 1
+            return nr_lines
+
+        lines = []
+        for dictionary in data:
+            lines.append(encode_output_line(dictionary))
+            if len(lines) == batch_size:
+                json_file.write("".join(lines))
+                nr_lines += batch_size
+                lines.clear()
+        json_file.write("".join(lines))
+        # The standard output is not closed, so it is flushed before the messages that follow the output
+        json_file.flush()
+
+    return nr_lines + len(lines)
+
+class RunStats:
+    """
+    Statistics of a run of the main workflow: the wall and CPU time of each stage and counters of the translations and
+    the output. main fills them in when it receives a RunStats object or the --stats option, and the functions that
+    receive one count the lines they read. The CPU time includes the processes of --workers once they finish.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.lines_read = 0
+        self.lines_parsed = 0
+        self.duplicates = 0
+        self.late_events = 0
+        self.minutes_emitted = 0
+        self.start_wall = time.perf_counter()
+        self.start_cpu = self.cpu_time()
+
+    @staticmethod
+    def cpu_time() -> float:
+        """
+        Returns the user and system CPU time of the process and of its finished child processes, in seconds.
+        """
+        return sum(os.times()[:4])
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Measures the wall and CPU time of the code inside the with statement as a stage of the run. A stage measured
+        more than once accumulates its times.
+
+        Parameters:
+            name (str): name of the stage.
+        """
+        start_wall, start_cpu = time.perf_counter(), self.cpu_time()
+        try:
+            yield self
+        finally:
+            wall_time, cpu_time = self.stages.get(name, (0.0, 0.0))
+            self.stages[name] = (
+                wall_time + time.perf_counter() - start_wall,
+                cpu_time + self.cpu_time() - start_cpu,
+            )
+
+    @property
+    def records_rejected(self) -> int:
+        """
+        Number of lines read that are not valid translations.
+        """
+        return self.lines_read - self.lines_parsed
+
+    @staticmethod
+    def peak_rss() -> int:
+        """
+        Returns the peak resident set size of the process, or of its largest finished child process if it is larger, in
+        bytes, or None where the resource module is not available.
+        """
+        if resource is None:
+            return None
+        peak_rss = max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        )
+        # Linux reports kilobytes and macOS reports bytes
+        return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+    def as_dict(self) -> dict:
+        """
+        Returns the statistics as a dictionary that can be serialized to json, e.g. for a metrics collector.
+
+        Returns:
+            dict: the times in seconds of each stage and of the whole run, the counters, the events per second and the
+                peak resident set size in bytes.
+        """
+        wall_time = time.perf_counter() - self.start_wall
+        events = self.lines_parsed
+
+        return {
+            "stages": {
+                name: {"wall_seconds": wall_time_stage, "cpu_seconds": cpu_time_stage}
+                for name, (wall_time_stage, cpu_time_stage) in self.stages.items()
+            },
+            "wall_seconds": wall_time,
+            "cpu_seconds": self.cpu_time() - self.start_cpu,
+            "lines_read": self.lines_read,
+            "lines_parsed": self.lines_parsed,
+            "records_rejected": self.records_rejected,
+            "duplicates_dropped": self.duplicates,
+            "late_events_dropped": self.late_events,
+            "minutes_emitted": self.minutes_emitted,
+            "events_per_second": events / wall_time if wall_time else None,
+            "peak_rss_bytes": self.peak_rss(),
+        }
+
+    def format_text(self) -> str:
+        """
+        Returns the statistics as human-readable text.
+
+        Returns:
+            str: a line for each stage and each counter.
+        """
+        stats = self.as_dict()
+        lines = [f"{'stage':<28} {'wall (s)':>10} {'cpu (s)':>10}"]
+        for name, times in stats["stages"].items():
+            lines.append(f"{name:<28} {times['wall_seconds']:>10.3f} {times['cpu_seconds']:>10.3f}")
+        lines.append(f"{'total':<28} {stats['wall_seconds']:>10.3f} {stats['cpu_seconds']:>10.3f}")
+
+        for key in (
+            "lines_read", "lines_parsed", "records_rejected", "duplicates_dropped", "late_events_dropped", "minutes_emitted"
+        ):
+            lines.append(f"{key.replace('_', ' '):<28} {stats[key]:>10,}")
+        lines.append(f"{'events per second':<28} {stats['events_per_second'] or 0:>10,.0f}")
+        if stats["peak_rss_bytes"] is not None:
+            lines.append(f"{'peak rss (MiB)':<28} {stats['peak_rss_bytes'] / 2**20:>10.1f}")
+
+        return "\n".join(lines)
+
+def parse_window_sizes(value: str) -> list[int]:
+    """
+    Converts the value of the --windows argument into a list of window sizes.
+
+    Parameters:
+        value (str): comma separated window sizes, e.g. "1,5,15,60".
+
+    Returns:
+        list[int]: the window sizes.
+    """
+    try:
+        return [int(size) for size in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"""invalid window sizes "{value}", expected comma separated integers""")
+
+def run_workflow(
+    args: argparse.Namespace, window_size, deduplicator, stats: RunStats = None, reorder_buffer: ReorderBuffer = None
+) -> bool:
+    """
+    Runs the workflow chosen by the command line arguments, from the input file to the output file.
+
+    Parameters:
+        args (argparse.Namespace): the parsed command line arguments.
+        window_size (int | list[int]): size of the window, or list of sizes, to be considered in the moving average.
+        deduplicator: object that detects the duplicated translations, as returned by create_deduplicator.
+        stats (RunStats, optional): statistics of the run, where the time of each stage and the counters are kept.
+        reorder_buffer (ReorderBuffer, optional): buffer that puts the translations back in order, for inputs that are
+            only ordered up to an allowed lateness.
+
+    Returns:
+        bool: False if --follow or --serve was stopped with Ctrl+C, True if the run finished.
+    """
+    # Measuring the stages costs nothing when the statistics are not collected
+    stage = stats.stage if stats is not None else lambda name: nullcontext()
+
+    # --follow, --workers and --cache read a single input file, which can also be given by a glob pattern
+    input_paths = expand_input_paths(args.path)
+    input_path = input_paths[0]
+
+    def read_translations() -> Iterator[dict]:
+        translations = iter_merged_translations(input_paths, deduplicator, stats)
+        if reorder_buffer is not None:
+            translations = iter_reordered_translations(translations, reorder_buffer)
+        return translations
+
+    def bucket_moving_average(buckets) -> Iterator[dict]:
+        if args.output_format == "dense":
+            return iter_bucket_moving_average(buckets, window_size)
+        return iter_sparse_moving_average(buckets, window_size, run_length=args.output_format == "runs")
+
+    if args.serve:
+        # The translations are parsed and indexed once, as they are read, then the queries are answered until interrupted
+        with stage("parse_and_build_index"):
+            translation_index = build_translation_index(read_translations(), args.index_by_client, deduplicator)
+        try:
+            serve_translation_index(translation_index, args.host, args.port, args.unix_socket)
+        except KeyboardInterrupt:
+            return False
+        return True
+
+    if args.follow:
+        # Runs until interrupted, resuming from the checkpoint if there is one
+        try:
+            with stage("follow"):
+                follow_moving_average(
+                    input_path,
+                    window_size,
+                    output_path=args.output,
+                    checkpoint_path=args.checkpoint,
+                    deduplicator=deduplicator,
+                    checkpoint_interval=args.checkpoint_interval,
+                    poll_interval=args.poll_interval,
+                )
+        except KeyboardInterrupt:
+            return False
+        return True
+
+    if args.group_by:
+        # The groups are computed in a single pass, either over the whole parsed input or over the translations as they are read
+        if args.stream:
+            translations = read_translations()
+        else:
+            with stage("parse"):
+                if args.cache:
+                    translations = list(pars_translation_files_cached(input_path, deduplicator, stats=stats).iter_translations())
+                else:
+                    translations = list(read_translations())
+        with stage("stream" if args.stream else "grouped_moving_average_and_write"):
+            nr_lines = save_output_file(
+                iter_grouped_moving_average(translations, window_size, args.group_by), args.output, flush=args.stream
+            )
+    elif args.workers > 1:
+        # The chunks of the file are parsed and aggregated per minute in parallel, and the windows slide over the merged buckets
+        with stage("parse_in_parallel"):
+            buckets = pars_translation_chunks(input_path, args.workers, deduplicator, stats)
+        with stage("moving_average_and_write"):
+            nr_lines = save_output_file(bucket_moving_average(buckets), args.output)
+    elif args.stream:
+        # Chain the parsing, windowing and writing stages, so the output is written while the input is being read
+        with stage("stream"):
+            if args.percentiles:
+                moving_averages = iter_moving_average(
+                    read_translations(), window_size, args.percentiles, args.percentile_accuracy
+                )
+            else:
+                moving_averages = bucket_moving_average(iter_minute_buckets(read_translations()))
+            nr_lines = save_output_file(moving_averages, args.output, flush=True)
+    elif args.engine == "numpy":
+        with stage("parse"):
+            if args.cache:
+                # The columns of the cache are used by NumPy without copying them
+                timestamps, durations = pars_translation_files_cached(input_path, deduplicator, stats=stats).to_arrays()
+            else:
+                timestamps, durations = load_translation_arrays(list(read_translations()))
+        with stage("list_of_minutes"):
+            list_of_minutes = create_list_of_minutes_numpy(timestamps)
+        with stage("moving_average"):
+            moving_average_list = calc_moving_average_numpy(list_of_minutes, timestamps, durations, window_size)
+        with stage("write"):
+            nr_lines = save_output_file(moving_average_list, args.output)
+    else:
+        # Build main workflow
+        with stage("parse"):
+            if args.cache:
+                parsed_data = list(pars_translation_files_cached(input_path, deduplicator, stats=stats).iter_translations())
+            else:
+                parsed_data = list(read_translations())
+        if args.output_format != "dense":
+            # The minutes are generated lazily, skipping the gaps, instead of listing every one of them
+            with stage("moving_average_and_write"):
+                nr_lines = save_output_file(bucket_moving_average(iter_minute_buckets(parsed_data)), args.output)
+        else:
+            with stage("list_of_minutes"):
+                list_of_minutes = create_list_of_minutes(parsed_data)
+            with stage("moving_average"):
+                moving_average_list = calc_moving_average(
+                    list_of_minutes, parsed_data, window_size, args.percentiles, args.percentile_accuracy
+                )
+            with stage("write"):
+                nr_lines = save_output_file(moving_average_list, args.output)
+
+    if stats is not None:
+        stats.minutes_emitted += nr_lines
+    return True
+
+def main(argv: list[str] = None, stats: RunStats = None):
+    """
+    Define main script
+
+    Parameters:
+        argv (list[str], optional): the command line arguments. By default, the ones of the script.
+        stats (RunStats, optional): object where the statistics of the run are collected, even without --stats.
+    """
+    # Define the arguments to define when calling for the script
     parser = argparse.ArgumentParser(
         description="Insert necessary arguments to compute the moving average for each timestamp", 
         epilog="Thank you :)"
     )
-    parser.add_argument("path", type=str, help="Path to the input file contaning the translations information")
-    parser.add_argument("window_size", type=int, help="Size of the window to be considered in the moving average")
+    parser.add_argument(
+        "path",
+        type=str,
+        help="Path to the input file contaning the translations information, or comma separated paths and glob patterns of files merged by timestamp"
+    )
+    parser.add_argument("window_size", type=int, nargs="?", help="Size of the window to be considered in the moving average")
+    parser.add_argument(
+        "--windows",
+        type=parse_window_sizes,
+        help="Comma separated window sizes (e.g. 1,5,15,60) computed in a single pass, instead of <window_size>"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="output_file.json",
+        help="Path to the output file, compressed when it ends with .gz or .zst, or - for the standard output"
+    )
+    parser.add_argument(
+        "--percentiles",
+        type=lambda value: [float(percentile) for percentile in value.split(",")],
+        help="Comma separated percentiles of the duration (e.g. 50,95,99) estimated for each window besides the average"
+    )
+    parser.add_argument(
+        "--percentile-accuracy",
+        type=float,
+        default=0.01,
+        help="Relative accuracy of the percentiles. A lower one uses more memory"
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="dense",
+        help="Write every minute (dense), only the minutes with translations inside the window (sparse), or the runs of minutes with the same averages (runs)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Process the translations one by one, using memory bounded by the window size. Use - as path to read from stdin"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("python", "numpy"),
+        default="python",
+        help="Compute the moving averages with pure Python or with vectorized NumPy operations (faster for large files)"
+    )
+    parser.add_argument(
+        "--group-by",
+        type=lambda value: value.split(","),
+        help=f"Comma separated fields whose values define groups with independent moving averages, from: {', '.join(GROUP_BY_FIELDS)}"
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Keep following the input file, appending each minute to the output file as soon as it is final"
+    )
+    parser.add_argument("--checkpoint", type=str, help="Path to the checkpoint file of --follow (by default, <path>.checkpoint)")
+    parser.add_argument("--checkpoint-interval", type=float, default=10.0, help="Seconds between checkpoints of --follow")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait for new translations in --follow")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Index the translations in memory and answer moving average queries over HTTP for any minute, window and client"
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address of the query server of --serve")
+    parser.add_argument("--port", type=int, default=8080, help="TCP port of the query server of --serve")
+    parser.add_argument("--unix-socket", type=str, help="Path of a Unix socket for the query server of --serve, instead of the TCP port")
+    parser.add_argument("--index-by-client", action="store_true", help="Also index each client, so --serve queries can filter by client")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes parsing chunks of the input file in parallel"
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Keep a binary cache of the parsed translations next to the input file, reused while the file does not change"
+    )
+    parser.add_argument(
+        "--dedup",
+        choices=DEDUPLICATION_STRATEGIES,
+        help="How duplicated translations are detected: keep every id (exact, the default), only the ids of the last --dedup-horizon minutes (window, the default with --stream and --follow) or use a Bloom filter (bloom)"
+    )
+    parser.add_argument(
+        "--dedup-horizon",
+        type=int,
+        help="Minutes during which a translation id is remembered by the window strategy (60 by default, the largest window size with --stream and --follow)"
+    )
+    parser.add_argument("--bloom-capacity", type=int, default=10_000_000, help="Expected number of translations for the bloom strategy")
+    parser.add_argument("--bloom-error-rate", type=float, default=0.001, help="Probability of dropping a new translation for the bloom strategy")
+
+    parser.add_argument(
+        "--allowed-lateness",
+        type=float,
+        help="Seconds that a translation may arrive behind the latest timestamp seen. Such translations are put back in order, and later ones are dropped and counted"
+    )
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        const="text",
+        choices=("text", "json"),
+        help="Print the time of each stage, the counters of translations and the peak memory to stderr, as text (default) or json"
+    )
+    parser.add_argument("--profile", type=str, help="Path to a cProfile file with the profile of the whole run, to be read with pstats")
+
+    args = parser.parse_args(argv)
+
+    if args.serve and (args.window_size is not None or args.windows is not None):
+        parser.error("--serve takes the window sizes from the queries, not from window_size or --windows")
+    if not args.serve and (args.window_size is None) == (args.windows is None):
+        parser.error("either window_size or --windows must be given")
+    window_size = args.window_size if args.windows is None else args.windows
+
+    if args.engine == "numpy" and args.stream:
+        parser.error("--engine numpy loads the whole input and cannot be used with --stream")
+    if args.engine == "numpy" and args.group_by:
+        parser.error("--engine numpy cannot be used with --group-by")
+    input_paths = expand_input_paths(args.path)
+    if args.follow and (args.stream or args.group_by or args.engine == "numpy" or args.workers > 1 or args.path == "-"):
+        parser.error("--follow needs an input file and cannot be used with --stream, --group-by, --engine numpy or --workers")
+    if args.follow and (args.output == "-" or args.output.endswith((".gz", ".zst"))):
+        parser.error("--follow needs an uncompressed output file")
+    if args.follow and input_paths[0].endswith((".gz", ".zst")):
+        parser.error("--follow needs an uncompressed input file")
+    if len(input_paths) > 1 and (args.follow or args.workers > 1 or args.cache):
+        parser.error("several input files cannot be used with --follow, --workers or --cache")
+    if args.workers > 1 and input_paths[0].endswith((".gz", ".zst")):
+        parser.error("--workers cannot split a compressed input file")
+    if args.workers > 1 and (args.stream or args.group_by or args.engine == "numpy" or args.path == "-"):
+        parser.error("--workers needs an input file and cannot be used with --stream, --group-by or --engine numpy")
+    if args.cache and (args.stream or args.follow or args.serve or args.workers > 1 or args.path == "-"):
+        parser.error("--cache needs an input file and cannot be used with --stream, --follow, --serve or --workers")
+    if args.output_format != "dense" and (args.follow or args.group_by or args.engine == "numpy"):
+        parser.error("--output-format sparse and runs cannot be used with --follow, --group-by or --engine numpy")
+    if args.serve and (
+        args.stream or args.follow or args.group_by or args.engine == "numpy" or args.workers > 1
+        or args.percentiles or args.output_format != "dense"
+    ):
+        parser.error("--serve cannot be used with --stream, --follow, --group-by, --engine numpy, --workers, --percentiles or --output-format")
+    if args.percentiles and (
+        args.follow or args.group_by or args.engine == "numpy" or args.workers > 1 or args.output_format != "dense"
+    ):
+        parser.error("--percentiles cannot be used with --follow, --group-by, --engine numpy, --workers or --output-format")
+    if args.allowed_lateness is not None and (args.follow or args.workers > 1 or args.cache):
+        parser.error("--allowed-lateness cannot be used with --follow, --workers or --cache")
+    if args.allowed_lateness is not None and args.allowed_lateness < 0:
+        parser.error("--allowed-lateness must not be negative")
+    if args.engine == "numpy" and np is None:
+        print("NumPy is not installed, using the python engine.", file=sys.stderr)
+        args.engine = "python"
+
+    # The memory of --stream and --follow must not grow with the input, so by default only the ids that can still be
+    # inside a window are kept
+    if args.dedup is None:
+        args.dedup = "window" if args.stream or args.follow else "exact"
+    if args.dedup_horizon is None:
+        args.dedup_horizon = 60
+        if args.stream or args.follow:
+            args.dedup_horizon = window_size if isinstance(window_size, int) else max(window_size)
+
+    deduplicator = create_deduplicator(args.dedup, args.dedup_horizon, args.bloom_capacity, args.bloom_error_rate)
+    reorder_buffer = None
+    if args.allowed_lateness is not None:
+        reorder_buffer = ReorderBuffer(timedelta(seconds=args.allowed_lateness))
+
+    if args.stats is not None and stats is None:
+        stats = RunStats()
+    profiler = cProfile.Profile() if args.profile else None
 
-    args = parser.parse_args()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        finished = run_workflow(args, window_size, deduplicator, stats, reorder_buffer)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if stats is not None:
+            stats.duplicates = deduplicator.duplicates
+            stats.late_events = reorder_buffer.late if reorder_buffer is not None else 0
+        # The statistics are also reported when the run fails, e.g. on a rejected record
+        if args.stats == "json":
+            print(json.dumps(stats.as_dict()), file=sys.stderr)
+        elif args.stats == "text":
+            print(stats.format_text(), file=sys.stderr)
 
-    # Build main workflow   
-    parsed_data = pars_translation_files(args.path)
-    list_of_minutes = create_list_of_minutes(parsed_data)
-    moving_average_list = calc_moving_average(list_of_minutes, parsed_data, args.window_size)
-    save_output_file(moving_average_list)
+    # --follow and --serve run until they are interrupted. The state of --follow is resumed from the last checkpoint, so
+    # the duplicates are not reported for this run alone
+    if not finished:
+        return
+    print(f"{deduplicator.duplicates} duplicated translations were dropped.", file=sys.stderr)
+    if reorder_buffer is not None:
+        print(f"{reorder_buffer.late} late translations were dropped.", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file